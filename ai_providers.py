@@ -1,21 +1,140 @@
 import os
-import json
+import re
+import time
+import asyncio
+import contextlib
+import logging
+import httpx
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
 import anthropic
-from huggingface_hub import InferenceClient
+from huggingface_hub import AsyncInferenceClient
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+
+
+# Shared HTTP connection pool for Anthropic clients (created lazily, reused across requests)
+ANTHROPIC_MAX_CONNECTIONS = 200
+ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS = 100
+ANTHROPIC_TIMEOUT_SECONDS = 60.0
+
+# Cap on in-flight Anthropic calls per process, sized to the account's rate-limit tier
+ANTHROPIC_CONCURRENCY = int(os.environ.get("ANTHROPIC_CONCURRENCY", "20"))
+
+_anthropic_http_client = None
+
+def get_anthropic_http_client() -> anthropic.DefaultAsyncHttpxClient:
+    """Return the process-wide httpx client used by every AsyncAnthropic instance"""
+    global _anthropic_http_client
+    if _anthropic_http_client is None or _anthropic_http_client.is_closed:
+        _anthropic_http_client = anthropic.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=ANTHROPIC_MAX_CONNECTIONS,
+                max_keepalive_connections=ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            timeout=ANTHROPIC_TIMEOUT_SECONDS
+        )
+    return _anthropic_http_client
+
+logger = logging.getLogger(__name__)
+
+# Output token cap for move predictions. The system prompt keeps the analysis sections short so the
+# move fits; a response cut off at the cap before any move is retried once with the larger cap
+MAX_OUTPUT_TOKENS = 512
+TRUNCATED_RETRY_MAX_OUTPUT_TOKENS = 1024
+
+# Text-format tool calls emitted by models without native function calling,
+# one per line: TOOL_CALL:move:from_position:to_position
+_TEXT_TOOL_CALL_RE = re.compile(r"^\s*TOOL_CALL:move:([^:\n]*):([^:\n]*)", re.MULTILINE)
+
+# Claude stops generating at the end of the <move_execution> block the system prompt asks for;
+# if that happens before a tool_use block, the move is read from the block's text instead
+ANTHROPIC_STOP_SEQUENCES = ["</move_execution>"]
+_MOVE_EXECUTION_RE = re.compile(
+    r'<move_execution>.*?from_position="([^"]*)",\s*to_position="([^"]*)"', re.DOTALL
+)
+
+# Retry policy for transient provider failures (rate limits, 5xx, network errors)
+RETRY_ATTEMPTS = 3
+RETRY_INITIAL_WAIT_SECONDS = 1
+RETRY_MAX_WAIT_SECONDS = 8
+
+
+class BatchNotSupportedError(Exception):
+    """Raised when message batches are requested from a provider without batch support"""
+    pass
+
+
+class CircuitOpenError(Exception):
+    """Raised when a provider's circuit breaker is open and calls fail fast"""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Fails fast once a provider has failed repeatedly, instead of piling up
+    requests against it. After reset_timeout seconds a single trial call is let
+    through while every other caller keeps failing fast; a success closes the
+    circuit, a failure opens it again.
+    """
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_progress = False
+    
+    def check(self, provider_name: str):
+        """Raise CircuitOpenError if calls to the provider should currently fail fast"""
+        if self._opened_at is None:
+            return
+        if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_progress:
+            raise CircuitOpenError(f"{provider_name} is temporarily unavailable after repeated failures")
+        # Half-open: this caller makes the trial call; the circuit stays open for everyone else
+        self._trial_in_progress = True
+    
+    def record_success(self):
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_progress = False
+    
+    def record_failure(self):
+        self._failures += 1
+        if self._trial_in_progress or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+        self._trial_in_progress = False
+    
+    def release(self):
+        """End a call whose outcome says nothing about the provider's health (e.g. a 400 or a cancellation)"""
+        self._trial_in_progress = False
+
+
+def _http_status(error: Exception) -> Optional[int]:
+    """Best-effort HTTP status code from an SDK/HTTP client exception"""
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
 
 
 class AIProvider(ABC):
     """Abstract base class for AI providers"""
     
+    # Subclasses define their own breaker so one provider's outage doesn't block the others
+    _circuit_breaker = CircuitBreaker()
+    # Optional limit on concurrent calls to the provider; None means unbounded
+    _concurrency_limit: Optional[asyncio.Semaphore] = None
+    # Whether submit_batch()/get_batch_results() are available; checked before offering batch endpoints
+    supports_batches = False
+    
     @abstractmethod
     def __init__(self, api_key: str, model: str):
         pass
     
     @abstractmethod
-    def generate_move_prediction(self, system_message: str, user_prompt: str, 
-                               tools: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def generate_move_prediction(self, system_message: str, user_prompt: str, 
+                                     tools: List[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Generate a move prediction with optional tool calling
         
@@ -27,74 +146,272 @@ class AIProvider(ABC):
         """
         pass
     
+    async def stream_move_prediction(self, system_message: str, user_prompt: str, 
+                                   tools: List[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a move prediction as it is generated
+        
+        Yields dicts of:
+            - {"type": "text", "text": str} for each text delta
+            - {"type": "tool_call", "tool_call": Dict} as soon as a tool call is complete (optional)
+            - {"type": "done", "text_content": str, "tool_calls": List[Dict]} once complete
+        
+        Providers without native streaming fall back to a single non-streamed call.
+        """
+        result = await self.generate_move_prediction(system_message, user_prompt, tools)
+        if result["text_content"]:
+            yield {"type": "text", "text": result["text_content"]}
+        yield {"type": "done", "text_content": result["text_content"], "tool_calls": result["tool_calls"]}
+    
+    async def submit_batch(self, system_message: str, user_prompts: Dict[str, str], 
+                           tools: List[Dict[str, Any]] = None) -> str:
+        """Submit prompts keyed by custom id for offline processing and return the batch id"""
+        raise BatchNotSupportedError(f"Provider '{self.get_provider_name()}' does not support message batches")
+    
+    async def get_batch_results(self, batch_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Return results keyed by custom id once the batch has ended, or None while it is still processing"""
+        raise BatchNotSupportedError(f"Provider '{self.get_provider_name()}' does not support message batches")
+    
     @abstractmethod
     def get_provider_name(self) -> str:
         """Return the name of the AI provider"""
         pass
+    
+    async def aclose(self):
+        """Release the provider's network resources"""
+        close = getattr(getattr(self, "client", None), "close", None)
+        if close is not None:
+            await close()
+    
+    def _is_transient_error(self, error: Exception) -> bool:
+        """Whether an error is worth retrying: rate limits, server errors and network failures"""
+        status = _http_status(error)
+        if status is not None:
+            return status == 429 or status >= 500
+        return isinstance(error, (asyncio.TimeoutError, ConnectionError, httpx.TransportError))
+    
+    def _concurrency_slot(self):
+        """Async context manager that holds one of the provider's concurrent call slots"""
+        return self._concurrency_limit if self._concurrency_limit is not None else contextlib.nullcontext()
+    
+    async def _call_with_retry(self, call, **params) -> Any:
+        """Make an SDK call behind the provider's circuit breaker, retrying transient errors with jittered backoff"""
+        self._circuit_breaker.check(self.get_provider_name())
+        try:
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(RETRY_ATTEMPTS),
+                wait=wait_exponential_jitter(RETRY_INITIAL_WAIT_SECONDS, RETRY_MAX_WAIT_SECONDS),
+                retry=retry_if_exception(self._is_transient_error),
+                reraise=True
+            ):
+                with attempt:
+                    # Hold a slot per attempt only, so backoff sleeps don't block other requests
+                    async with self._concurrency_slot():
+                        result = await call(**params)
+        except BaseException as e:
+            if isinstance(e, Exception) and self._is_transient_error(e):
+                self._circuit_breaker.record_failure()
+            else:
+                self._circuit_breaker.release()
+            raise
+        
+        self._circuit_breaker.record_success()
+        return result
 
 
 class AnthropicProvider(AIProvider):
     """Anthropic Claude provider implementation"""
     
+    # Shared by all Anthropic instances: an outage affects every model
+    _circuit_breaker = CircuitBreaker()
+    # Shared for the same reason: rate limits apply per account, not per model
+    _concurrency_limit = asyncio.Semaphore(ANTHROPIC_CONCURRENCY)
+    supports_batches = True
+    
     def __init__(self, api_key: str = None, model: str = "claude-3-5-sonnet-20240620"):
         self.api_key = api_key or os.environ.get("ANTHROPIC_S")
         if not self.api_key:
             raise ValueError("Anthropic API key is required. Set ANTHROPIC_S environment variable or pass api_key parameter.")
         
         self.model = model
-        self.client = anthropic.Anthropic(api_key=self.api_key)
+        self.client = anthropic.AsyncAnthropic(
+            api_key=self.api_key,
+            http_client=get_anthropic_http_client(),
+            # _call_with_retry is the only retry layer; SDK retries would multiply its attempts
+            # and sleep through their backoff while holding a concurrency slot
+            max_retries=0
+        )
+    
+    def _build_request_params(self, system_message: str, user_prompt: str, 
+                              tools: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Build the Messages API request parameters"""
+        request_params = {
+            "model": self.model,
+            "max_tokens": MAX_OUTPUT_TOKENS,
+            "stop_sequences": ANTHROPIC_STOP_SEQUENCES,
+            # Breakpoint for the static prefix (tools + system prompt). Anthropic only caches prefixes of
+            # at least 1024 tokens (2048 for Haiku) and this one is shorter, so for now it is a no-op;
+            # it starts paying off without further changes if the system prompt grows past the minimum
+            "system": [{
+                "type": "text",
+                "text": system_message,
+                "cache_control": {"type": "ephemeral"}
+            }],
+            "messages": [{"role": "user", "content": user_prompt}]
+        }
+        
+        # Add tools if provided
+        if tools:
+            request_params["tools"] = tools
+        
+        return request_params
     
-    def generate_move_prediction(self, system_message: str, user_prompt: str, 
-                               tools: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def generate_move_prediction(self, system_message: str, user_prompt: str, 
+                                     tools: List[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Generate move prediction using Claude"""
         try:
-            # Prepare the request parameters
-            request_params = {
-                "model": self.model,
-                "max_tokens": 1024,
-                "system": system_message,
-                "messages": [{"role": "user", "content": user_prompt}]
-            }
-            
-            # Add tools if provided
-            if tools:
-                request_params["tools"] = tools
+            request_params = self._build_request_params(system_message, user_prompt, tools)
             
             # Make the API call
-            response = self.client.messages.create(**request_params)
+            response = await self._call_with_retry(self.client.messages.create, **request_params)
+            result = self._parse_message(response)
             
-            # Extract text content
-            text_content = ""
-            for content_block in response.content:
-                if content_block.type == "text":
-                    text_content += content_block.text
+            if self._truncated_before_move(response, result):
+                logger.warning("%s hit max_tokens=%d before choosing a move; retrying with max_tokens=%d",
+                               self.model, MAX_OUTPUT_TOKENS, TRUNCATED_RETRY_MAX_OUTPUT_TOKENS)
+                request_params["max_tokens"] = TRUNCATED_RETRY_MAX_OUTPUT_TOKENS
+                response = await self._call_with_retry(self.client.messages.create, **request_params)
+                result = self._parse_message(response)
             
-            # Parse tool calls
-            tool_calls = self._parse_tool_calls(response.content)
+            return result
             
-            return {
-                "text_content": text_content,
-                "tool_calls": tool_calls,
-                "raw_response": response
-            }
+        except Exception as e:
+            raise Exception(f"Anthropic API call failed: {str(e)}")
+    
+    def _truncated_before_move(self, response: Any, result: Dict[str, Any]) -> bool:
+        """Whether generation stopped at the output token cap without producing a move"""
+        return getattr(response, "stop_reason", None) == "max_tokens" and not result["tool_calls"]
+    
+    async def submit_batch(self, system_message: str, user_prompts: Dict[str, str], 
+                           tools: List[Dict[str, Any]] = None) -> str:
+        """Submit prompts to the Message Batches API (half the price of live calls, results within 24h)"""
+        try:
+            batch = await self._call_with_retry(
+                self.client.messages.batches.create,
+                requests=[
+                    {"custom_id": custom_id, "params": self._build_request_params(system_message, user_prompt, tools)}
+                    for custom_id, user_prompt in user_prompts.items()
+                ]
+            )
+        except Exception as e:
+            raise Exception(f"Anthropic batch submission failed: {str(e)}")
+        return batch.id
+    
+    async def get_batch_results(self, batch_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Fetch Message Batches API results once processing has ended"""
+        try:
+            batch = await self._call_with_retry(self.client.messages.batches.retrieve, message_batch_id=batch_id)
+            if batch.processing_status != "ended":
+                return None
             
+            results = {}
+            async for entry in await self.client.messages.batches.results(batch_id):
+                if entry.result.type == "succeeded":
+                    results[entry.custom_id] = self._parse_message(entry.result.message)
+                    if self._truncated_before_move(entry.result.message, results[entry.custom_id]):
+                        logger.warning("Batch %s entry %s hit max_tokens=%d before choosing a move",
+                                       batch_id, entry.custom_id, MAX_OUTPUT_TOKENS)
+                else:
+                    # errored, canceled or expired
+                    results[entry.custom_id] = {"error": entry.result.type}
+            return results
+        except Exception as e:
+            raise Exception(f"Anthropic batch retrieval failed: {str(e)}")
+    
+    def _parse_message(self, response: Any) -> Dict[str, Any]:
+        """Extract text content and tool calls from a Messages API response"""
+        text_content = "".join(block.text for block in response.content if block.type == "text")
+        
+        return {
+            "text_content": text_content,
+            "tool_calls": self._parse_tool_calls(response.content, text_content),
+            "raw_response": response
+        }
+    
+    async def stream_move_prediction(self, system_message: str, user_prompt: str, 
+                                   tools: List[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream move prediction from Claude as text deltas"""
+        request_params = self._build_request_params(system_message, user_prompt, tools)
+        self._circuit_breaker.check(self.get_provider_name())
+        
+        try:
+            async with self._concurrency_slot(), self.client.messages.stream(**request_params) as stream:
+                async for event in stream:
+                    if event.type == "text":
+                        yield {"type": "text", "text": event.text}
+                    elif event.type == "content_block_stop" and event.content_block.type == "tool_use":
+                        yield {"type": "tool_call", "tool_call": self._tool_call_from_block(event.content_block)}
+                response = await stream.get_final_message()
         except Exception as e:
+            if self._is_transient_error(e):
+                self._circuit_breaker.record_failure()
+            else:
+                self._circuit_breaker.release()
             raise Exception(f"Anthropic API call failed: {str(e)}")
+        except BaseException:
+            # Cancelled, or the consumer closed the stream early
+            self._circuit_breaker.release()
+            raise
+        
+        self._circuit_breaker.record_success()
+        
+        text_content = "".join(block.text for block in response.content if block.type == "text")
+        tool_calls = self._parse_tool_calls(response.content, text_content)
+        if response.stop_reason == "max_tokens" and not tool_calls:
+            # Text has already been streamed to the client, so this is reported rather than retried
+            logger.warning("%s hit max_tokens=%d before choosing a move", self.model, MAX_OUTPUT_TOKENS)
+        yield {"type": "done", "text_content": text_content, "tool_calls": tool_calls}
     
-    def _parse_tool_calls(self, response_content: List[Any]) -> List[Dict[str, Any]]:
-        """Parse tool calls from Claude's response content blocks"""
+    def _parse_tool_calls(self, response_content: List[Any], text_content: str = "") -> List[Dict[str, Any]]:
+        """Parse tool calls from Claude's response content blocks, falling back to the <move_execution> text"""
         tool_calls = []
         
         for content_block in response_content:
             if hasattr(content_block, 'type') and content_block.type == "tool_use":
+                tool_calls.append(self._tool_call_from_block(content_block))
+        
+        if not tool_calls and "<move_execution>" in text_content:
+            match = _MOVE_EXECUTION_RE.search(text_content)
+            if match:
                 tool_calls.append({
-                    "tool": content_block.name,
-                    "arguments": content_block.input,
-                    "id": content_block.id
+                    "tool": "move",
+                    "arguments": {
+                        "from_position": match.group(1).strip(),
+                        "to_position": match.group(2).strip()
+                    },
+                    "id": "move_execution"
                 })
         
         return tool_calls
     
+    def _is_transient_error(self, error: Exception) -> bool:
+        """Retry rate limits, overloaded/5xx responses and connection errors"""
+        if isinstance(error, (anthropic.RateLimitError, anthropic.APIConnectionError)):
+            return True
+        return isinstance(error, anthropic.APIStatusError) and error.status_code >= 500
+    
+    def _tool_call_from_block(self, content_block: Any) -> Dict[str, Any]:
+        """Convert a tool_use content block into the provider-neutral tool call format"""
+        return {
+            "tool": content_block.name,
+            "arguments": content_block.input,
+            "id": content_block.id
+        }
+    
+    async def aclose(self):
+        """Nothing to release per instance: the connection pool is shared and closed by close_ai_providers()"""
+        pass
+    
     def get_provider_name(self) -> str:
         """Return the provider name"""
         return "anthropic"
@@ -103,6 +420,9 @@ class AnthropicProvider(AIProvider):
 class HuggingFaceProvider(AIProvider):
     """Hugging Face provider implementation"""
     
+    # Shared by all Hugging Face instances: an outage affects every model
+    _circuit_breaker = CircuitBreaker()
+    
     def __init__(self, api_key: str = None, model: str = "Qwen/Qwen2.5-72B-Instruct", provider: str = "nebius"):
         self.api_key = api_key or os.environ.get("HF_TOKEN")
         if not self.api_key:
@@ -110,39 +430,46 @@ class HuggingFaceProvider(AIProvider):
         
         self.model = model
         self.provider = provider
-        self.client = InferenceClient(
+        self.client = AsyncInferenceClient(
             provider=self.provider,
             api_key=self.api_key
         )
+        # (tools, rendered text) for the last tools list seen; callers pass the same constant every time
+        self._tools_prompt_cache: Optional[Tuple[List[Dict[str, Any]], str]] = None
+    
+    def _build_request_params(self, system_message: str, user_prompt: str, 
+                              tools: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Build the chat completion request parameters"""
+        # Prepare messages - combine system and user messages since HF format may be different
+        messages = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_prompt}
+        ]
+        
+        # Prepare request parameters
+        request_params = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": MAX_OUTPUT_TOKENS,
+            "temperature": 0.1  # Lower temperature for more consistent chess moves
+        }
+        
+        # Note: Tool calling support may vary by model/provider
+        # For now, we'll handle tools in the prompt if they exist
+        if tools:
+            # Convert tools to text description since not all HF models support function calling
+            messages[-1]["content"] += self._tools_prompt(tools)
+        
+        return request_params
     
-    def generate_move_prediction(self, system_message: str, user_prompt: str, 
-                               tools: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def generate_move_prediction(self, system_message: str, user_prompt: str, 
+                                     tools: List[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Generate move prediction using Hugging Face"""
         try:
-            # Prepare messages - combine system and user messages since HF format may be different
-            messages = [
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": user_prompt}
-            ]
-            
-            # Prepare request parameters
-            request_params = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": 1024,
-                "temperature": 0.1  # Lower temperature for more consistent chess moves
-            }
-            
-            # Note: Tool calling support may vary by model/provider
-            # For now, we'll handle tools in the prompt if they exist
-            if tools:
-                # Convert tools to text description since not all HF models support function calling
-                tools_description = self._tools_to_text(tools)
-                messages[-1]["content"] += f"\n\nAvailable tools:\n{tools_description}"
-                messages[-1]["content"] += "\n\nIf you want to make a move, respond with: TOOL_CALL:move:from_position:to_position"
+            request_params = self._build_request_params(system_message, user_prompt, tools)
             
             # Make the API call
-            response = self.client.chat.completions.create(**request_params)
+            response = await self._call_with_retry(self.client.chat.completions.create, **request_params)
             
             # Extract text content
             text_content = response.choices[0].message.content or ""
@@ -159,6 +486,61 @@ class HuggingFaceProvider(AIProvider):
         except Exception as e:
             raise Exception(f"Hugging Face API call failed: {str(e)}")
     
+    async def stream_move_prediction(self, system_message: str, user_prompt: str, 
+                                   tools: List[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream move prediction from Hugging Face as text deltas"""
+        request_params = self._build_request_params(system_message, user_prompt, tools)
+        text_parts = []
+        # Pieces of the current line, which ends at the next newline
+        line_parts = []
+        eager_calls = 0
+        
+        try:
+            stream = await self._call_with_retry(self.client.chat.completions.create, **request_params, stream=True)
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                text_parts.append(delta)
+                yield {"type": "text", "text": delta}
+                
+                if not tools:
+                    continue
+                # Emit each TOOL_CALL line as soon as its terminating newline arrives;
+                # every line is looked at once, so this stays linear in the response length
+                *completed, unterminated = delta.split("\n")
+                for piece in completed:
+                    line_parts.append(piece)
+                    match = _TEXT_TOOL_CALL_RE.match("".join(line_parts))
+                    line_parts.clear()
+                    if match:
+                        yield {"type": "tool_call", "tool_call": self._tool_call_from_match(match, eager_calls)}
+                        eager_calls += 1
+                line_parts.append(unterminated)
+        except Exception as e:
+            raise Exception(f"Hugging Face API call failed: {str(e)}")
+        
+        text_content = "".join(text_parts)
+        # Tool calls are embedded in the text, so parse them once the full response is in
+        tool_calls = self._parse_text_tool_calls(text_content) if tools else []
+        yield {"type": "done", "text_content": text_content, "tool_calls": tool_calls}
+    
+    def _tools_prompt(self, tools: List[Dict[str, Any]]) -> str:
+        """Text appended to the user prompt describing the tools, rendered once per tools list"""
+        cached = self._tools_prompt_cache
+        if cached is not None and cached[0] is tools:
+            return cached[1]
+        
+        tools_description = self._tools_to_text(tools)
+        tools_prompt = (
+            f"\n\nAvailable tools:\n{tools_description}"
+            "\n\nIf you want to make a move, respond with: TOOL_CALL:move:from_position:to_position"
+        )
+        self._tools_prompt_cache = (tools, tools_prompt)
+        return tools_prompt
+    
     def _tools_to_text(self, tools: List[Dict[str, Any]]) -> str:
         """Convert tools to text description"""
         descriptions = []
@@ -176,30 +558,29 @@ class HuggingFaceProvider(AIProvider):
     
     def _parse_text_tool_calls(self, text_content: str) -> List[Dict[str, Any]]:
         """Parse tool calls from text response"""
+        # Cheap substring check so responses without a tool call skip the regex scan
+        if "TOOL_CALL:" not in text_content:
+            return []
+        
         tool_calls = []
-        lines = text_content.split('\n')
         
-        for line in lines:
-            line = line.strip()
-            if line.startswith('TOOL_CALL:'):
-                try:
-                    # Format: TOOL_CALL:move:from_position:to_position
-                    parts = line.split(':')
-                    if len(parts) >= 4 and parts[1] == 'move':
-                        tool_calls.append({
-                            "tool": "move",
-                            "arguments": {
-                                "from_position": parts[2],
-                                "to_position": parts[3]
-                            },
-                            "id": f"hf_call_{len(tool_calls)}"
-                        })
-                except Exception as e:
-                    print(f"Error parsing tool call from HF response: {e}")
-                    continue
+        # Format: TOOL_CALL:move:from_position:to_position
+        for match in _TEXT_TOOL_CALL_RE.finditer(text_content):
+            tool_calls.append(self._tool_call_from_match(match, len(tool_calls)))
         
         return tool_calls
     
+    def _tool_call_from_match(self, match: re.Match, index: int) -> Dict[str, Any]:
+        """Convert a TOOL_CALL line match into the provider-neutral tool call format"""
+        return {
+            "tool": "move",
+            "arguments": {
+                "from_position": match.group(1),
+                "to_position": match.group(2).strip()
+            },
+            "id": f"hf_call_{index}"
+        }
+    
     def get_provider_name(self) -> str:
         """Return the provider name"""
         return "huggingface"
@@ -216,10 +597,20 @@ class AIProviderFactory:
         # "google": GoogleProvider,
     }
     
+    # Provider instances keyed by (provider_name, api_key, model) so SDK clients
+    # and their connection pools are reused across requests. Instances are shared by
+    # concurrent requests, so providers must treat their configuration as immutable and
+    # keep no per-request state (memoized derived values like rendered tools are fine).
+    # The model comes from the client, so the cache is an LRU holding at most
+    # INSTANCE_CACHE_MAXSIZE instances. Evicted instances are not closed: a request may
+    # still be using one, so it is left to be garbage collected once that request is done.
+    INSTANCE_CACHE_MAXSIZE = 32
+    _instance_cache: "OrderedDict[Tuple[str, Optional[str], Optional[str]], AIProvider]" = OrderedDict()
+    
     @classmethod
     def create_provider(cls, provider_name: str, api_key: str = None, 
                        model: str = None) -> AIProvider:
-        """Create an AI provider instance"""
+        """Create an AI provider instance, reusing a cached one when available"""
         if provider_name not in cls._providers:
             available = ", ".join(cls._providers.keys())
             raise ValueError(f"Unknown provider: {provider_name}. Available providers: {available}")
@@ -235,19 +626,54 @@ class AIProviderFactory:
             }
             model = default_models.get(provider_name)
         
-        return provider_class(api_key=api_key, model=model)
+        cache_key = (provider_name, api_key, model)
+        provider = cls._instance_cache.get(cache_key)
+        if provider is not None:
+            cls._instance_cache.move_to_end(cache_key)
+            return provider
+        
+        provider = provider_class(api_key=api_key, model=model)
+        cls._instance_cache[cache_key] = provider
+        while len(cls._instance_cache) > cls.INSTANCE_CACHE_MAXSIZE:
+            cls._instance_cache.popitem(last=False)
+        return provider
+    
+    @classmethod
+    async def close_all(cls):
+        """Close and forget every cached provider instance"""
+        providers = list(cls._instance_cache.values())
+        cls._instance_cache.clear()
+        for provider in providers:
+            await provider.aclose()
     
     @classmethod
     def get_available_providers(cls) -> List[str]:
         """Get list of available provider names"""
         return list(cls._providers.keys())
     
+    @classmethod
+    def is_available(cls, provider_name: str) -> bool:
+        """Whether a provider is registered (a dict lookup, cheap enough for every request)"""
+        return provider_name in cls._providers
+    
     @classmethod
     def register_provider(cls, name: str, provider_class: type):
         """Register a new provider class"""
         if not issubclass(provider_class, AIProvider):
             raise ValueError("Provider class must inherit from AIProvider")
         cls._providers[name] = provider_class
+        # Drop instances created from a previously registered class
+        for cache_key in [key for key in cls._instance_cache if key[0] == name]:
+            del cls._instance_cache[cache_key]
+
+
+async def close_ai_providers():
+    """Close cached providers and the shared Anthropic connection pool (call on app shutdown)"""
+    global _anthropic_http_client
+    await AIProviderFactory.close_all()
+    if _anthropic_http_client is not None:
+        await _anthropic_http_client.aclose()
+        _anthropic_http_client = None
 
 
 # Convenience function for creating providers
@@ -1303,6 +1303,7 @@ class SimpleCheckers {
         const availableModels = {
             anthropic: [
                 { value: 'claude-3-5-sonnet-20240620', label: 'Claude 3.5 Sonnet' },
+                { value: 'auto', label: 'Auto (Haiku for simple positions, Sonnet otherwise)' },
                 { value: 'claude-3-haiku-20240307', label: 'Claude 3 Haiku (Fast)' },
                 { value: 'claude-3-opus-20240229', label: 'Claude 3 Opus (Most Capable)' }
             ],
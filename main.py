@@ -1,14 +1,85 @@
 import os
-import json
+import atexit
+import asyncio
+import logging
+import logging.handlers
+import queue
+import orjson
+import zstandard
 import sqlite3
+import threading
 import datetime
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager, aclosing
+import time
+import functools
+import io
+import itertools
+import operator
+import hashlib
+from collections import OrderedDict
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Dict, Any, List, Optional
-from ai_providers import create_ai_provider, AIProviderFactory
+from fastapi.routing import APIRoute
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ConfigDict
+from typing import Dict, Any, List, Optional, Tuple, NamedTuple, Final, Callable, Coroutine
+from ai_providers import (
+    create_ai_provider, AIProviderFactory, AIProvider,
+    get_anthropic_http_client, close_ai_providers
+)
+
+# Log records go through a queue to a background thread, so slow stderr writes never block the event loop
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    handlers=[logging.handlers.QueueHandler(log_queue)]
+)
+log_listener.start()
+# Flush anything still queued when the process exits
+atexit.register(log_listener.stop)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Checkers AI API", description="FastAPI backend for checkers move prediction")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers and shared clients on startup; stop and close them on shutdown"""
+    # Open the shared Anthropic connection pool once, on the app's event loop
+    get_anthropic_http_client()
+    move_writer.start()
+    yield
+    await move_writer.stop()
+    await close_ai_providers()
+    close_database()
+
+class ORJSONRequest(Request):
+    """Request whose JSON body is decoded with orjson instead of the stdlib json module"""
+    
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            # orjson.JSONDecodeError subclasses json.JSONDecodeError, so FastAPI still answers 422
+            self._json = orjson.loads(await self.body())
+        return self._json
+
+class ORJSONRoute(APIRoute):
+    """Route class that hands FastAPI an ORJSONRequest, so request bodies are parsed with orjson"""
+    
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        route_handler = super().get_route_handler()
+        
+        async def orjson_route_handler(request: Request) -> Response:
+            return await route_handler(ORJSONRequest(request.scope, request.receive))
+        
+        return orjson_route_handler
+
+app = FastAPI(
+    title="Checkers AI API",
+    description="FastAPI backend for checkers move prediction",
+    lifespan=lifespan
+)
+# Must be set before any route is declared
+app.router.route_class = ORJSONRoute
 
 # Add CORS middleware to allow requests from your frontend
 app.add_middleware(
@@ -20,93 +91,213 @@ app.add_middleware(
 )
 
 # Database setup
-DATABASE_PATH = "checkers_game_data.db"
+DATABASE_PATH = os.environ.get("CHECKERS_DB_PATH", "checkers_game_data.db")
+
+# One connection per process, shared by the request threads; sqlite3 connections are not
+# safe for concurrent use, so every statement runs under _db_lock
+_db_conn: Optional[sqlite3.Connection] = None
+_db_lock = threading.Lock()
+
+def get_db_connection() -> sqlite3.Connection:
+    """Return the process-wide SQLite connection, opening it on first use"""
+    global _db_conn
+    if _db_conn is None:
+        # Autocommit mode: each statement is its own transaction
+        conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False, isolation_level=None)
+        # WAL lets readers and the writer proceed concurrently; NORMAL skips an fsync per commit
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        _db_conn = conn
+    return _db_conn
+
+def close_database():
+    """Close the shared SQLite connection; the next query reopens it"""
+    global _db_conn
+    with _db_lock:
+        if _db_conn is not None:
+            _db_conn.close()
+            _db_conn = None
+
+# Bump SCHEMA_VERSION whenever SCHEMA_SQL changes so existing databases pick it up
+SCHEMA_VERSION = 1
+SCHEMA_SQL = f"""
+BEGIN;
+
+-- Game moves table with provider and model information
+CREATE TABLE IF NOT EXISTS game_moves (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    game_id TEXT NOT NULL,
+    player TEXT NOT NULL,
+    move_number INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    user_prompt TEXT NOT NULL,
+    llm_analysis TEXT NOT NULL,
+    tool_name TEXT,
+    tool_parameters TEXT,
+    previous_moves BLOB,        -- zstd-compressed JSON (plain JSON text in older rows)
+    board_state BLOB NOT NULL,  -- zstd-compressed JSON (plain JSON text in older rows)
+    provider TEXT,
+    model TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Game winners table
+CREATE TABLE IF NOT EXISTS game_winners (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    game_id TEXT NOT NULL UNIQUE,
+    winner_color TEXT NOT NULL,
+    winner_type TEXT NOT NULL,  -- 'human' or 'ai'
+    provider TEXT,              -- NULL if human, provider name if AI
+    model TEXT,                 -- NULL if human, model name if AI
+    game_duration_seconds INTEGER,
+    total_moves INTEGER,
+    finish_reason TEXT,         -- 'capture_all', 'resignation', 'draw', etc.
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+-- /log-winner looks moves up by game_id; game_winners.game_id is already indexed by its UNIQUE constraint
+CREATE INDEX IF NOT EXISTS idx_game_moves_game_id ON game_moves(game_id);
+
+PRAGMA user_version = {SCHEMA_VERSION};
+
+COMMIT;
+"""
 
 def init_database():
     """Initialize the SQLite database and create tables if they don't exist"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    # Game moves table with provider and model information
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS game_moves (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            game_id TEXT NOT NULL,
-            player TEXT NOT NULL,
-            move_number INTEGER NOT NULL,
-            timestamp TEXT NOT NULL,
-            user_prompt TEXT NOT NULL,
-            llm_analysis TEXT NOT NULL,
-            tool_name TEXT,
-            tool_parameters TEXT,
-            previous_moves TEXT,
-            board_state TEXT NOT NULL,
-            provider TEXT,
-            model TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Game winners table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS game_winners (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            game_id TEXT NOT NULL UNIQUE,
-            winner_color TEXT NOT NULL,
-            winner_type TEXT NOT NULL,  -- 'human' or 'ai'
-            provider TEXT,              -- NULL if human, provider name if AI
-            model TEXT,                 -- NULL if human, model name if AI
-            game_duration_seconds INTEGER,
-            total_moves INTEGER,
-            finish_reason TEXT,         -- 'capture_all', 'resignation', 'draw', etc.
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    conn.commit()
-    conn.close()
+    with _db_lock:
+        conn = get_db_connection()
+        # Databases already at the current schema skip the DDL entirely
+        if conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+            return
+        conn.executescript(SCHEMA_SQL)
+
+# zstd level for the JSON blobs stored with each move; board states of one game compress well
+DB_COMPRESSION_LEVEL = 3
+
+def compress_json(json_bytes: bytes) -> bytes:
+    """zstd-compress encoded JSON for storage"""
+    # The one-shot function is thread-safe, unlike a shared ZstdCompressor
+    return zstandard.compress(json_bytes, DB_COMPRESSION_LEVEL)
 
 def save_move_to_db(game_id: str, player: str, move_number: int, user_prompt: str, 
                    llm_analysis: str, tool_name: str = None, tool_parameters: str = None, 
-                   previous_moves: str = "", board_state: str = "", provider: str = None, model: str = None):
-    """Save move data to the database"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
+                   previous_moves: bytes = None, board_state: bytes = b"", provider: str = None, model: str = None):
+    """Queue move data for the database writer (or save it directly when the writer isn't running)"""
     timestamp = datetime.datetime.now().isoformat()
     
-    cursor.execute("""
-        INSERT INTO game_moves 
-        (game_id, player, move_number, timestamp, user_prompt, llm_analysis, 
-         tool_name, tool_parameters, previous_moves, board_state, provider, model)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (game_id, player, move_number, timestamp, user_prompt, llm_analysis,
-          tool_name, tool_parameters, previous_moves, board_state, provider, model))
+    move_writer.submit((game_id, player, move_number, timestamp, user_prompt, llm_analysis,
+                        tool_name, tool_parameters, previous_moves, board_state, provider, model))
+
+def save_moves_to_db(rows: List[Tuple]):
+    """Insert game_moves rows in a single transaction"""
+    with _db_lock:
+        conn = get_db_connection()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany("""
+                INSERT INTO game_moves 
+                (game_id, player, move_number, timestamp, user_prompt, llm_analysis, 
+                 tool_name, tool_parameters, previous_moves, board_state, provider, model)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+def game_has_moves(game_id: str) -> bool:
+    """Whether any move has been recorded for the game"""
+    with _db_lock:
+        return get_db_connection().execute(
+            "SELECT 1 FROM game_moves WHERE game_id = ? LIMIT 1", (game_id,)
+        ).fetchone() is not None
+
+# Queued by MoveWriter.stop() to end the writer task after the rows ahead of it
+_STOP_WRITER = None
+
+class MoveWriter:
+    """
+    Writes game_moves rows from a background task, so requests never wait on SQLite.
+    
+    submit() may be called from any thread; the task drains everything queued
+    since its last write and inserts it with one executemany in one transaction.
+    """
     
-    conn.commit()
-    conn.close()
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        """Start the background writer task on the running event loop"""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the writer once it has saved every row queued so far, including a write in progress"""
+        if self._task is None:
+            return
+        # Cancelling instead would return while a to_thread write could still be running
+        self._queue.put_nowait(_STOP_WRITER)
+        await self._task
+        self._task = None
+        
+        # Rows that arrived behind the stop marker
+        rows = []
+        while not self._queue.empty():
+            rows.append(self._queue.get_nowait())
+        if rows:
+            save_moves_to_db(rows)
+    
+    def submit(self, row: Tuple):
+        """Queue a game_moves row for writing"""
+        if self._task is None:
+            # Writer not running (e.g. outside the app lifespan): write synchronously
+            save_moves_to_db([row])
+            return
+        # Background tasks run in the threadpool, and asyncio.Queue is not thread-safe
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, row)
+    
+    async def _run(self):
+        while True:
+            rows = [await self._queue.get()]
+            while not self._queue.empty():
+                rows.append(self._queue.get_nowait())
+            
+            stopping = _STOP_WRITER in rows
+            rows = [row for row in rows if row is not _STOP_WRITER]
+            if rows:
+                try:
+                    await asyncio.to_thread(save_moves_to_db, rows)
+                except Exception as e:
+                    logger.error("Failed to save %d move(s) to database: %s", len(rows), e)
+            if stopping:
+                return
+
+move_writer = MoveWriter()
 
 def save_game_winner(game_id: str, winner_color: str, winner_type: str, provider: str = None, 
                     model: str = None, game_duration_seconds: int = None, total_moves: int = None, 
                     finish_reason: str = "unknown"):
-    """Save game winner information to the database"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
+    """
+    Save game winner information to the database.
     
-    try:
-        cursor.execute("""
-            INSERT INTO game_winners 
+    Returns False without writing when the game has no recorded moves or its
+    winner was already logged; game_has_moves() tells the two apart.
+    """
+    with _db_lock:
+        cursor = get_db_connection().execute("""
+            INSERT OR IGNORE INTO game_winners 
             (game_id, winner_color, winner_type, provider, model, game_duration_seconds, total_moves, finish_reason)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (game_id, winner_color, winner_type, provider, model, game_duration_seconds, total_moves, finish_reason))
-        
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        # Game already recorded
-        return False
-    finally:
-        conn.close()
+            SELECT ?, ?, ?, ?, ?, ?, ?, ?
+            WHERE EXISTS (SELECT 1 FROM game_moves WHERE game_id = ?)
+        """, (game_id, winner_color, winner_type, provider, model, game_duration_seconds, total_moves, finish_reason,
+              game_id))
+        return cursor.rowcount == 1
 
 # Initialize database on startup
 init_database()
@@ -115,6 +306,27 @@ init_database()
 DEFAULT_PROVIDER = "anthropic"
 DEFAULT_MODEL = "claude-3-5-sonnet-20240620"
 
+# model="auto" picks a tier per position: (fast model, strong model) for each provider that supports it
+AUTO_MODEL = "auto"
+AUTO_MODEL_TIERS = {
+    "anthropic": ("claude-3-haiku-20240307", DEFAULT_MODEL),
+}
+# Positions with at most this many quiet moves (or this early in the game) go to the fast model
+AUTO_FAST_MAX_MOVES = 4
+AUTO_FAST_MAX_TURN = 4
+
+def pick_model(provider: str, board_state: Dict[str, Any]) -> str:
+    """Pick the fast model for simple positions and the strong model for contested ones"""
+    fast_model, strong_model = AUTO_MODEL_TIERS[provider]
+    available_moves = board_state.get("availableMoves", [])
+    
+    # Captures decide games, so any jump goes to the strong model
+    if any(move.get("isJump") for move in available_moves):
+        return strong_model
+    if len(available_moves) <= AUTO_FAST_MAX_MOVES or board_state.get("turnNumber", 0) <= AUTO_FAST_MAX_TURN:
+        return fast_model
+    return strong_model
+
 # Define available tool
 def make_move(from_position: str, to_position: str, game_id: str = "unknown") -> str:
     """
@@ -131,11 +343,6 @@ def make_move(from_position: str, to_position: str, game_id: str = "unknown") ->
 
     return f"Move executed: {from_position} -> {to_position}"
 
-# Tool registry
-AVAILABLE_TOOLS = {
-    "move": make_move
-}
-
 # Tool definition for Claude (Anthropic format)
 TOOL_DEFINITIONS = [
     {
@@ -160,37 +367,54 @@ TOOL_DEFINITIONS = [
 
 def execute_tool_call(tool_name: str, arguments: Dict[str, Any], game_id: str = "unknown") -> Any:
     """Execute a tool call with the given arguments"""
-    if tool_name not in AVAILABLE_TOOLS:
-        raise ValueError(f"Unknown tool: {tool_name}")
+    if tool_name == "move":
+        try:
+            return make_move(arguments["from_position"], arguments["to_position"], game_id=game_id)
+        except KeyError as e:
+            return f"Error executing tool: missing argument {e}"
     
-    tool_function = AVAILABLE_TOOLS[tool_name]
-    try:
-        # Add game_id to arguments if it's the move tool
-        if tool_name == "move":
-            arguments = arguments.copy()
-            arguments["game_id"] = game_id
-        
-        result = tool_function(**arguments)
-        return result
-    except Exception as e:
-        return f"Error executing tool: {str(e)}"
+    raise ValueError(f"Unknown tool: {tool_name}")
 
 # Note: Tool call parsing is now handled by the AI provider classes
 
 # Pydantic models for move prediction
 class PredictMoveRequest(BaseModel):
-    board_state: Dict[str, Any]
+    model_config = ConfigDict(extra='ignore', validate_assignment=False)
+    
+    # Treated as opaque JSON, so a plain dict avoids per-key validation of the nested board state
+    board_state: dict
     game_id: Optional[str] = None
     provider: str  # Required: frontend must specify provider
     model: str     # Required: frontend must specify model
 
 class PredictMoveResponse(BaseModel):
+    model_config = ConfigDict(extra='ignore', validate_assignment=False)
+    
     analysis: str
     suggested_move: Dict[str, str] = {}
     reasoning: str = ""
     tool_calls: List[Dict[str, Any]] = []
     tool_results: List[Dict[str, Any]] = []
 
+# Pydantic models for bulk (non-interactive) move prediction through provider message batches
+class BatchPosition(BaseModel):
+    board_state: dict
+
+class PredictMovesBatchRequest(BaseModel):
+    positions: List[BatchPosition]
+    provider: str
+    model: str
+
+class PredictMovesBatchResponse(BaseModel):
+    batch_id: str
+    custom_ids: List[str]  # One per submitted position, in request order
+
+class BatchResultsResponse(BaseModel):
+    batch_id: str
+    status: str  # "in_progress" or "ended"
+    results: Dict[str, PredictMoveResponse] = {}
+    errors: Dict[str, str] = {}
+
 # Pydantic models for game winner logging
 class LogWinnerRequest(BaseModel):
     game_id: str
@@ -207,52 +431,8 @@ class LogWinnerResponse(BaseModel):
     game_id: str
     winner_info: Dict[str, Any]
 
-@app.get("/")
-async def root():
-    """Health check endpoint"""
-    available_providers = AIProviderFactory.get_available_providers()
-    return {
-        "message": "Checkers AI API is running with per-request provider selection", 
-        "available_endpoints": ["/predict-move", "/log-winner", "/providers"],
-        "available_providers": available_providers,
-        "note": "Each request must specify 'provider' and 'model' parameters"
-    }
-
-@app.post("/predict-move", response_model=PredictMoveResponse)
-async def predict_next_move(request: PredictMoveRequest):
-    """
-    Analyze checkers board state and predict the best move using AI provider with tool calling
-    """
-    try:
-        # Validate provider is available
-        available_providers = AIProviderFactory.get_available_providers()
-        if request.provider not in available_providers:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Provider '{request.provider}' not available. Available providers: {available_providers}"
-            )
-        
-        # Create AI provider based on request
-        current_provider = create_ai_provider(
-            provider_name=request.provider,
-            model=request.model
-        )
-        
-        # Log game ID for tracking
-        game_id = request.game_id or "unknown"
-        print(f"[Game {game_id}] Processing move prediction request with {current_provider.get_provider_name()} provider (model: {request.model})")
-        
-        board_state = request.board_state
-        current_player = board_state.get("currentPlayer", "unknown")
-        available_moves = board_state.get("availableMoves", [])
-        # Use the actual move history length + 1 for the next move number
-        move_history = board_state.get("moveHistory", [])
-        move_number = len(move_history) + 1
-        
-        print(f"[Game {game_id}] Current player: {current_player}, Available moves: {len(available_moves)}")
-        
-        # Create an optimized system message for competitive checkers play
-        system_message = """You are an expert AI playing competitive American Checkers. Your goal is to win by making optimal moves. Analyze the given position and select the best move based on the following information:
+# System message for competitive checkers play; kept byte-identical across requests so providers can cache the prefix
+SYSTEM_MESSAGE: Final[str] = """You are an expert AI playing competitive American Checkers. Your goal is to win by making optimal moves. Analyze the given position and select the best move based on the following information:
 
 Analysis Process:
 1. Evaluate the current board state, considering piece count, positions, and potential king promotions.
@@ -282,142 +462,311 @@ Select the best move from the available moves list. Consider how this move will
 Output your analysis, strategic reasoning, and chosen move in the following format:
 
 <analysis>
-Provide a detailed analysis of the current position, including material count, positional advantages/disadvantages, and key tactical considerations.
+In a few sentences, analyze the current position: material count, positional advantages/disadvantages, and key tactical considerations.
 </analysis>
 
 <strategy>
-Explain your strategic plan for the next few moves, considering both offensive and defensive elements.
+In one or two sentences, explain your strategic plan for the next few moves, considering both offensive and defensive elements.
 </strategy>
 
 <move_selection>
-State your chosen move and provide a comprehensive justification for why this move is optimal given the current game state and your strategic goals.
+State your chosen move and justify it in one or two sentences.
 </move_selection>
 
 <move_execution>
 Execute your chosen move using the exact notation format: from_position="X1", to_position="Y2"
 </move_execution>
 
-Your final output should include all the reasoning data"""
+Keep the sections above short so the move execution is always reached."""
 
-        # Create optimized prompt with concise board analysis
-        moves_list = []
-        jump_moves = []
-        regular_moves = []
-        
-        for move in available_moves:
-            move_notation = f"{move['from']['notation']}-{move['to']['notation']}"
-            if move.get("isJump"):
-                jump_moves.append(move_notation)
-            else:
-                regular_moves.append(move_notation)
-        
-        # Format moves compactly
-        if jump_moves:
-            moves_text = f"JUMPS (mandatory): {', '.join(jump_moves)}"
-        elif regular_moves:
-            moves_text = f"Available: {', '.join(regular_moves)}"
-        else:
-            moves_text = "No moves available"
-        
-        # Get strategic context based on game phase
-        phase = board_state.get('gamePhase', 'unknown')
-        turn = board_state.get('turnNumber', 0)
-        
-        if phase == 'opening' and turn <= 10:
-            strategy_hint = "Opening: Control center, develop pieces safely"
-        elif phase == 'midgame' or (10 < turn <= 30):
-            strategy_hint = "Midgame: Seek tactical opportunities, advance for kings"
-        else:
-            strategy_hint = "Endgame: Calculate precisely, coordinate pieces"
-        
-        # Compact piece analysis
-        red_total = board_state.get('pieceCount', {}).get('red', {}).get('total', 0)
-        white_total = board_state.get('pieceCount', {}).get('white', {}).get('total', 0)
-        red_kings = board_state.get('pieceCount', {}).get('red', {}).get('kings', 0)
-        white_kings = board_state.get('pieceCount', {}).get('white', {}).get('kings', 0)
-        
-        material_balance = "Even" if red_total == white_total else f"{'Red' if red_total > white_total else 'White'} +{abs(red_total - white_total)}"
+# Prediction cache so repeated positions don't trigger another LLM call
+PREDICTION_CACHE_SIZE = 4096
+PREDICTION_CACHE_TTL_SECONDS = 3600
+
+class PredictionCache:
+    """In-memory LRU cache of move predictions with a per-entry time-to-live"""
+    
+    def __init__(self, maxsize: int = PREDICTION_CACHE_SIZE, ttl_seconds: float = PREDICTION_CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, Tuple[float, PredictMoveResponse]] = OrderedDict()
+    
+    def get(self, key: str) -> Optional[PredictMoveResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    def set(self, key: str, value: PredictMoveResponse):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+prediction_cache = PredictionCache()
+
+# Predictions currently being generated, keyed like the cache, so concurrent requests for the
+# same position share one provider call instead of each paying for it
+inflight_predictions: Dict[str, asyncio.Future] = {}
+
+class PredictionAbandoned(Exception):
+    """Set on an in-flight prediction whose generating request was cancelled before it finished"""
+    pass
+
+def _board_key(board_state: Dict[str, Any]) -> Optional[List[Any]]:
+    """
+    Canonical position: sorted piece squares, side to move, the mandatory-jump
+    flag and the sorted legal moves. None if the board state has no position.
+    """
+    pieces = board_state.get("boardNotation")
+    if pieces:
+        position = sorted(pieces)
+    elif board_state.get("boardString"):
+        position = board_state["boardString"]
+    else:
+        return None
+    moves = sorted(
+        f"{move['from']['notation']}-{move['to']['notation']}"
+        for move in board_state.get("availableMoves", [])
+    )
+    return [position, board_state.get("currentPlayer", "unknown"), bool(board_state.get("mustJump")), moves]
+
+def _prediction_cache_key(board_state: Dict[str, Any], provider: str, model: str) -> Optional[str]:
+    """Hashed cache key for a prediction; predictions are only shared within the same provider/model"""
+    board_key = _board_key(board_state)
+    if board_key is None:
+        return None
+    canonical = orjson.dumps([provider, model, board_key])
+    return hashlib.blake2b(canonical, digest_size=16).hexdigest()
+
+def _is_cacheable_prediction(prediction: PredictMoveResponse, board_state: Dict[str, Any]) -> bool:
+    """
+    Only predictions whose move is legal in the position are cached; an illegal
+    suggestion is rejected by the client, and a retry should ask the model again.
+    """
+    suggested_move = prediction.suggested_move
+    if not suggested_move:
+        return False
+    return any(
+        move["from"]["notation"] == suggested_move["from"] and move["to"]["notation"] == suggested_move["to"]
+        for move in board_state.get("availableMoves", [])
+    )
+
+async def _generate_prediction(current_provider: AIProvider, system_message: str, analysis_prompt: str, 
+                               game_id: str) -> PredictMoveResponse:
+    """Ask the AI provider for a move and execute any tool calls it makes"""
+    try:
+        ai_response = await current_provider.generate_move_prediction(
+            system_message=system_message,
+            user_prompt=analysis_prompt,
+            tools=TOOL_DEFINITIONS
+        )
         
-        # Format move history for the prompt
-        move_history = board_state.get('moveHistory', [])
-        total_moves = board_state.get('totalMoves', 0)
+        analysis_text = ai_response["text_content"]
+        tool_calls = ai_response["tool_calls"]
         
-        if move_history:
-            # Show last 12 moves to avoid overwhelming the prompt
-            recent_moves = move_history[-12:] if len(move_history) > 12 else move_history
-            
-            # Format moves with clear player indication and better grouping
-            formatted_moves = []
-            current_move_pair = ""
+    except Exception as e:
+        logger.error("%s API call failed: %s", current_provider.get_provider_name(), e)
+        raise HTTPException(status_code=500, detail=f"Failed to get response from {current_provider.get_provider_name()}: {str(e)}")
+    
+    return _execute_tool_calls(analysis_text, tool_calls, game_id)
+
+async def _coalesced_prediction(cache_key: Optional[str], current_provider: AIProvider, 
+                                analysis_prompt: str, board_state: Dict[str, Any], game_id: str) -> PredictMoveResponse:
+    """Generate and cache a prediction, or wait for an identical one that is already in flight"""
+    if cache_key is None:
+        return await _generate_prediction(current_provider, SYSTEM_MESSAGE, analysis_prompt, game_id)
+    
+    # No await between the lookup and the insert, so this is atomic on the event loop
+    future = inflight_predictions.get(cache_key)
+    if future is not None:
+        logger.debug("[Game %s] Waiting for in-flight prediction for this position", game_id)
+        try:
+            return await asyncio.shield(future)
+        except PredictionAbandoned:
+            # The request generating it was cancelled (e.g. its client disconnected): take over,
+            # or join whichever waiter already has
+            return await _coalesced_prediction(cache_key, current_provider, analysis_prompt, board_state, game_id)
+    
+    future = asyncio.get_running_loop().create_future()
+    inflight_predictions[cache_key] = future
+    try:
+        prediction = await _generate_prediction(current_provider, SYSTEM_MESSAGE, analysis_prompt, game_id)
+        if _is_cacheable_prediction(prediction, board_state):
+            prediction_cache.set(cache_key, prediction)
+        future.set_result(prediction)
+        return prediction
+    except asyncio.CancelledError:
+        # Only this request was cancelled; waiters retry rather than failing with it
+        future.set_exception(PredictionAbandoned())
+        future.exception()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark the exception as retrieved so it isn't logged when nobody else was waiting
+        future.exception()
+        raise
+    finally:
+        inflight_predictions.pop(cache_key, None)
+
+def _execute_tool_calls(analysis_text: str, tool_calls: List[Dict[str, Any]], game_id: str) -> PredictMoveResponse:
+    """Execute the provider's tool calls and build the move prediction response"""
+    tool_results = []
+    suggested_move = {}
+    
+    # Execute any detected tool calls
+    for tool_call in tool_calls:
+        try:
+            result = execute_tool_call(tool_call["tool"], tool_call["arguments"], game_id)
+            tool_results.append({
+                "tool": tool_call["tool"],
+                "arguments": tool_call["arguments"],
+                "result": result,
+                "id": tool_call.get("id")
+            })
             
-            for i, move in enumerate(recent_moves):
-                player_indicator = "Red" if move['player'] == 'red' else "White"
-                move_str = f"{move['from']}-{move['to']}"
-                
-                # Add capture notation
-                if move.get('isJump') and move.get('capturedPiece'):
-                    move_str = f"{move['from']}x{move['capturedPiece']}"
-                
-                # Add promotion notation
-                if move.get('wasPromoted'):
-                    move_str += "=K"
+            # If it's a move tool call, extract the suggested move
+            if tool_call["tool"] == "move":
+                suggested_move = {
+                    "from": tool_call["arguments"]["from_position"],
+                    "to": tool_call["arguments"]["to_position"]
+                }
+                logger.debug("[Game %s] Suggested move: %s → %s", game_id, suggested_move['from'], suggested_move['to'])
                 
-                # Group moves by full move number (Red + White = 1 full move)
-                if move['player'] == 'red':
-                    current_move_pair = f"{move['fullMoveNumber']}. {move_str}"
-                else:  # white
-                    if current_move_pair:
-                        current_move_pair += f" {move_str}"
-                        formatted_moves.append(current_move_pair)
-                        current_move_pair = ""
-                    else:
-                        # White move without preceding red move (shouldn't normally happen)
-                        formatted_moves.append(f"{move['fullMoveNumber']}... {move_str}")
-            
-            # Add any remaining unpaired red move
-            if current_move_pair:
-                formatted_moves.append(current_move_pair)
-            
-            # Create the history text
-            if len(move_history) > 12:
-                history_text = f"MOVE HISTORY (last 12 of {total_moves} moves):\n"
-            else:
-                history_text = f"MOVE HISTORY ({total_moves} moves):\n"
-            
-            # Format in lines of 3 move pairs for readability
-            move_lines = []
-            for i in range(0, len(formatted_moves), 3):
-                line_moves = formatted_moves[i:i+3]
-                move_lines.append(" ".join(line_moves))
-            
-            history_text += "\n".join(move_lines)
-            
-            # Add last move summary for context
-            last_move = recent_moves[-1]
-            last_player = "Red" if last_move['player'] == 'red' else "White"
-            last_move_desc = f"{last_move['from']}-{last_move['to']}"
-            if last_move.get('isJump'):
-                last_move_desc = f"{last_move['from']}x{last_move.get('capturedPiece', '?')}"
-            if last_move.get('wasPromoted'):
-                last_move_desc += " (promoted to King)"
-            
-            history_text += f"\nLAST MOVE: {last_player} played {last_move_desc}"
-            
-        else:
-            history_text = "GAME START: No moves played yet - opening position"
-        
-        analysis_prompt = f"""Position Analysis - {current_player.title()} to move (Turn {turn})
+        except Exception as e:
+            tool_results.append({
+                "tool": tool_call["tool"],
+                "arguments": tool_call["arguments"],
+                "error": str(e),
+                "id": tool_call.get("id")
+            })
+    
+    return PredictMoveResponse(
+        analysis=analysis_text,
+        suggested_move=suggested_move,
+        reasoning=analysis_text,
+        tool_calls=tool_calls,
+        tool_results=tool_results
+    )
 
-BOARD:
-{board_state.get('boardString', 'Board not available')}
+def _forced_move_prediction(board_state: Dict[str, Any], game_id: str) -> Optional[PredictMoveResponse]:
+    """Prediction for a position with exactly one legal move, or None if there is a choice to make"""
+    available_moves = board_state.get("availableMoves", [])
+    # Jumps are mandatory, so a single jump is forced even if the client also listed plain moves
+    jump_moves = [move for move in available_moves if move.get("isJump")]
+    legal_moves = jump_moves or available_moves
+    if len(legal_moves) != 1:
+        return None
+    
+    move = legal_moves[0]
+    arguments = {
+        "from_position": move["from"]["notation"],
+        "to_position": move["to"]["notation"]
+    }
+    return PredictMoveResponse(
+        analysis="Forced move.",
+        suggested_move={"from": arguments["from_position"], "to": arguments["to_position"]},
+        reasoning="Only one legal move.",
+        tool_calls=[{"tool": "move", "arguments": arguments, "id": "forced"}],
+        tool_results=[{
+            "tool": "move",
+            "arguments": arguments,
+            "result": execute_tool_call("move", arguments, game_id),
+            "id": "forced"
+        }]
+    )
 
-{history_text}
+def _get_request_provider(request: PredictMoveRequest) -> AIProvider:
+    """
+    Validate the requested provider and return an instance for the requested model.
+    
+    A model of "auto" is resolved from the board state and written back to request.model,
+    so logging, caching and the database see the model that actually answered.
+    """
+    if not AIProviderFactory.is_available(request.provider):
+        # Only build the provider list when reporting the error
+        available_providers = AIProviderFactory.get_available_providers()
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Provider '{request.provider}' not available. Available providers: {available_providers}"
+        )
+    
+    if request.model == AUTO_MODEL:
+        if request.provider not in AUTO_MODEL_TIERS:
+            raise HTTPException(status_code=400, detail=f"Model 'auto' is not supported for provider '{request.provider}'")
+        request.model = pick_model(request.provider, request.board_state)
+    
+    return create_ai_provider(
+        provider_name=request.provider,
+        model=request.model
+    )
+
+# Piece symbols in the order they are listed by _compact_board
+_PIECE_SYMBOLS = ("r", "R", "w", "W")
+
+def _compact_board(board_state: Dict[str, Any]) -> str:
+    """
+    FEN-like piece placement, e.g. "r:A1,C1,E1 R:G3 w:B8,D8".
+    
+    Lists occupied squares per piece type from the frontend's boardNotation
+    ("B8:r" entries), which carries the same information as the ASCII
+    boardString in a fraction of the prompt tokens. Falls back to
+    boardString when boardNotation is missing.
+    """
+    board_notation = board_state.get("boardNotation")
+    if not board_notation:
+        return board_state.get('boardString', 'Board not available')
+    
+    squares = {symbol: [] for symbol in _PIECE_SYMBOLS}
+    for entry in board_notation:
+        square, _, symbol = entry.partition(":")
+        if symbol in squares:
+            squares[symbol].append(square)
+    
+    return " ".join(
+        f"{symbol}:{','.join(sorted(squares[symbol]))}"
+        for symbol in _PIECE_SYMBOLS if squares[symbol]
+    ) or "empty"
+
+class _PromptInputs(NamedTuple):
+    """Hashable snapshot of the board state fields the analysis prompt depends on"""
+    current_player: str
+    turn: int
+    phase: str
+    # Compact piece placement from _compact_board
+    board: str
+    red_total: int
+    white_total: int
+    # (notation, is_jump) per available move
+    moves: Tuple[Tuple[str, bool], ...]
+    # (player, full_move_number, from, to, is_jump, captured_piece, was_promoted) for the last 12 moves
+    recent_moves: Tuple[Tuple[Any, ...], ...]
+    history_length: int
+    total_moves: int
 
-POSITION: {material_balance} material | Red: {red_total}({red_kings}♔) White: {white_total}({white_kings}♔)
-MOVES: {moves_text}
-STRATEGY: {strategy_hint}
+_OPENING_STRATEGY = "Opening: Control center, develop pieces safely"
+_MIDGAME_STRATEGY = "Midgame: Seek tactical opportunities, advance for kings"
+_ENDGAME_STRATEGY = "Endgame: Calculate precisely, coordinate pieces"
 
-Analyze this position and select your best move. Consider:
+# Strategy hint per game phase, indexed by turn band (turns 1-10, 11-30, 31+). Turns 11-30 are
+# always treated as midgame, and only the opening phase gets the opening hint
+_DEFAULT_STRATEGY = (_ENDGAME_STRATEGY, _MIDGAME_STRATEGY, _ENDGAME_STRATEGY)
+_STRATEGY_BY_PHASE = {
+    "opening": (_OPENING_STRATEGY, _MIDGAME_STRATEGY, _ENDGAME_STRATEGY),
+    "midgame": (_MIDGAME_STRATEGY, _MIDGAME_STRATEGY, _MIDGAME_STRATEGY),
+}
+
+# Position-specific parts of the analysis prompt, before and after the move history
+_PROMPT_HEADER_TPL = "{player} to move, turn {turn}. Pieces: r/w = red/white man, R/W = king.\nPOS:{separator}{board}\n"
+_PROMPT_SUMMARY_TPL = "\nMATERIAL: {material}\nMOVES: {moves}\nSTRATEGY: {strategy}\n\n"
+
+# Instructions closing every analysis prompt; only the position-specific text above them varies
+_ANALYSIS_PROMPT_FOOTER = """Analyze this position and select your best move. Consider:
 • MOVE HISTORY ANALYSIS: What patterns emerge from the game so far? Are there tactical themes, repeated motifs, or strategic plans developing?
 • IMMEDIATE TACTICS: Mandatory jumps, threats, piece safety, and forcing moves
 • POSITIONAL FACTORS: Center control, piece activity, pawn structure, and mobility
@@ -426,87 +775,331 @@ Analyze this position and select your best move. Consider:
 
 Execute your chosen move using the move tool with exact notation (e.g., "C3" to "D4")."""
 
-        # Make the AI prediction request
-        try:
-            ai_response = current_provider.generate_move_prediction(
-                system_message=system_message,
-                user_prompt=analysis_prompt,
-                tools=TOOL_DEFINITIONS
-            )
-            
-            analysis_text = ai_response["text_content"]
-            tool_calls = ai_response["tool_calls"]
-            
-        except Exception as e:
-            print(f"{current_provider.get_provider_name()} API call failed: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to get response from {current_provider.get_provider_name()}: {str(e)}")
-        
-        tool_results = []
-        suggested_move = {}
+def _build_analysis_prompt(board_state: Dict[str, Any]) -> str:
+    """Render the per-position user prompt from the frontend board state"""
+    # "or {}" also covers explicit nulls from the client
+    piece_count = board_state.get('pieceCount') or {}
+    red = piece_count.get('red') or {}
+    white = piece_count.get('white') or {}
+    move_history = board_state.get('moveHistory', [])
+    
+    inputs = _PromptInputs(
+        current_player=board_state.get("currentPlayer", "unknown"),
+        turn=board_state.get('turnNumber', 0),
+        phase=board_state.get('gamePhase', 'unknown'),
+        board=_compact_board(board_state),
+        red_total=red.get('total', 0),
+        white_total=white.get('total', 0),
+        moves=tuple(
+            (f"{move['from']['notation']}-{move['to']['notation']}", bool(move.get("isJump")))
+            for move in board_state.get("availableMoves", [])
+        ),
+        # Show last 12 moves to avoid overwhelming the prompt
+        recent_moves=tuple(
+            (move['player'], move['fullMoveNumber'], move['from'], move['to'],
+             bool(move.get('isJump')), move.get('capturedPiece'), bool(move.get('wasPromoted')))
+            for move in move_history[-12:]
+        ),
+        history_length=len(move_history),
+        total_moves=board_state.get('totalMoves', 0)
+    )
+    try:
+        return _render_analysis_prompt(inputs)
+    except TypeError:
+        # A client value that can't be hashed (e.g. capturedPiece sent as an object) can't be a
+        # cache key; render that prompt uncached, as it was rendered before the cache existed
+        return _render_analysis_prompt.__wrapped__(inputs)
+
+@functools.lru_cache(maxsize=2048)
+def _render_analysis_prompt(inputs: _PromptInputs) -> str:
+    """Render the analysis prompt; cached so repeated positions skip the string building"""
+    # Create optimized prompt with concise board analysis
+    jump_moves = [notation for notation, is_jump in inputs.moves if is_jump]
+    regular_moves = [notation for notation, is_jump in inputs.moves if not is_jump]
+    
+    # Format moves compactly
+    if jump_moves:
+        moves_text = f"JUMPS (mandatory): {' '.join(jump_moves)}"
+    elif regular_moves:
+        moves_text = f"Available: {' '.join(regular_moves)}"
+    else:
+        moves_text = "No moves available"
+    
+    # Get strategic context based on game phase and turn band
+    turn = inputs.turn
+    turn_band = 0 if turn <= 10 else 1 if turn <= 30 else 2
+    strategy_hint = _STRATEGY_BY_PHASE.get(inputs.phase, _DEFAULT_STRATEGY)[turn_band]
+    
+    # Piece counts are readable from POS; only the balance is spelled out
+    red_total, white_total = inputs.red_total, inputs.white_total
+    material_balance = "Even" if red_total == white_total else f"{'Red' if red_total > white_total else 'White'} +{abs(red_total - white_total)}"
+    
+    buffer = io.StringIO()
+    buffer.write(_PROMPT_HEADER_TPL.format(
+        player=inputs.current_player.title(),
+        turn=turn,
+        # The ASCII boardString fallback is multi-line, so it goes on its own lines
+        separator="\n" if "\n" in inputs.board else " ",
+        board=inputs.board
+    ))
+    
+    # Format move history for the prompt
+    if inputs.recent_moves:
+        # (full move number, is red, move string) with capture and promotion notation
+        history = [
+            (full_move_number, player == 'red',
+             (f"{from_square}x{captured_piece}" if is_jump and captured_piece else f"{from_square}-{to_square}")
+             + ("=K" if was_promoted else ""))
+            for player, full_move_number, from_square, to_square, is_jump, captured_piece, was_promoted
+            in inputs.recent_moves
+        ]
         
-        # Execute any detected tool calls
-        for tool_call in tool_calls:
-            try:
-                result = execute_tool_call(tool_call["tool"], tool_call["arguments"], game_id)
-                tool_results.append({
-                    "tool": tool_call["tool"],
-                    "arguments": tool_call["arguments"],
-                    "result": result,
-                    "id": tool_call.get("id")
-                })
-                
-                # If it's a move tool call, extract the suggested move
-                if tool_call["tool"] == "move":
-                    suggested_move = {
-                        "from": tool_call["arguments"]["from_position"],
-                        "to": tool_call["arguments"]["to_position"]
-                    }
-                    print(f"[Game {game_id}] Suggested move: {suggested_move['from']} → {suggested_move['to']}")
-                    
-            except Exception as e:
-                tool_results.append({
-                    "tool": tool_call["tool"],
-                    "arguments": tool_call["arguments"],
-                    "error": str(e),
-                    "id": tool_call.get("id")
-                })
+        # The last entry is the opponent's latest move, so no separate last-move line is needed
+        if inputs.history_length > 12:
+            buffer.write(f"HIST (last 12 of {inputs.total_moves}):\n")
+        else:
+            buffer.write(f"HIST ({inputs.total_moves}):\n")
         
-        # Save move data to database
-        try:
-            # Prepare data for database storage
-            previous_moves_json = json.dumps(board_state.get('moveHistory', []))
-            board_state_json = json.dumps(board_state)
-            tool_name = tool_calls[0]["tool"] if tool_calls else None
-            tool_parameters = json.dumps(tool_calls[0]["arguments"]) if tool_calls else None
-            
-            save_move_to_db(
-                game_id=game_id,
-                player=current_player,
-                move_number=move_number,
-                user_prompt=analysis_prompt,
-                llm_analysis=analysis_text,
-                tool_name=tool_name,
-                tool_parameters=tool_parameters,
-                previous_moves=previous_moves_json,
-                board_state=board_state_json,
-                provider=request.provider,
-                model=request.model
-            )
-            print(f"[Game {game_id}] Move data saved to database with {request.provider}/{request.model}")
-        except Exception as e:
-            print(f"[Game {game_id}] Failed to save to database: {e}")
+        # Group moves by full move number (Red + White = 1 full move); a multi-jump keeps all its legs.
+        # A group opening with White (history window starts mid-move) is written "N... move".
+        # Groups are written straight into the buffer in lines of 3 for readability
+        for pair_index, (full_move_number, moves) in enumerate(itertools.groupby(history, key=operator.itemgetter(0))):
+            if pair_index:
+                buffer.write("\n" if pair_index % 3 == 0 else " ")
+            _, opens_with_red, move_str = next(moves)
+            buffer.write(f"{full_move_number}{'.' if opens_with_red else '...'} {move_str}")
+            for _, _, move_str in moves:
+                buffer.write(" ")
+                buffer.write(move_str)
+    else:
+        buffer.write("HIST: none (opening position)")
+    
+    buffer.write(_PROMPT_SUMMARY_TPL.format(material=material_balance, moves=moves_text, strategy=strategy_hint))
+    buffer.write(_ANALYSIS_PROMPT_FOOTER)
+    
+    return buffer.getvalue()
+
+def _record_move(game_id: str, board_state: Dict[str, Any], analysis_prompt: str, 
+                 prediction: PredictMoveResponse, provider: str, model: str):
+    """Record a predicted move in the database; failures are logged, not raised"""
+    try:
+        # Prepare data for database storage
+        tool_calls = prediction.tool_calls
+        move_history = board_state.get('moveHistory', [])
+        # The history is the largest part of the board state: encode it once and splice
+        # the encoded bytes into the board state rather than serializing it twice
+        move_history_json = orjson.dumps(move_history)
+        if 'moveHistory' in board_state:
+            board_state_json = orjson.dumps({**board_state, 'moveHistory': orjson.Fragment(move_history_json)})
+        else:
+            board_state_json = orjson.dumps(board_state)
+        tool_name = tool_calls[0]["tool"] if tool_calls else None
+        tool_parameters = orjson.dumps(tool_calls[0]["arguments"]).decode() if tool_calls else None
         
-        return PredictMoveResponse(
-            analysis=analysis_text,
-            suggested_move=suggested_move,
-            reasoning=analysis_text,
-            tool_calls=tool_calls,
-            tool_results=tool_results
+        save_move_to_db(
+            game_id=game_id,
+            player=board_state.get("currentPlayer", "unknown"),
+            # Use the actual move history length + 1 for the next move number
+            move_number=len(move_history) + 1,
+            user_prompt=analysis_prompt,
+            llm_analysis=prediction.analysis,
+            tool_name=tool_name,
+            tool_parameters=tool_parameters,
+            previous_moves=compress_json(move_history_json),
+            board_state=compress_json(board_state_json),
+            provider=provider,
+            model=model
         )
+        logger.debug("[Game %s] Move data queued for database with %s/%s", game_id, provider, model)
+    except Exception as e:
+        logger.error("[Game %s] Failed to save to database: %s", game_id, e)
+
+@app.get("/")
+async def root():
+    """Health check endpoint"""
+    available_providers = AIProviderFactory.get_available_providers()
+    return {
+        "message": "Checkers AI API is running with per-request provider selection", 
+        "available_endpoints": ["/predict-move", "/predict-move-stream", "/predict-moves-batch", "/log-winner", "/providers"],
+        "available_providers": available_providers,
+        "note": "Each request must specify 'provider' and 'model' parameters"
+    }
+
+@app.post("/predict-move", response_model=PredictMoveResponse)
+async def predict_next_move(request: PredictMoveRequest, background_tasks: BackgroundTasks):
+    """
+    Analyze checkers board state and predict the best move using AI provider with tool calling.
+    
+    The move is saved to the database after the response has been sent.
+    """
+    try:
+        current_provider = _get_request_provider(request)
+        
+        # Log game ID for tracking
+        game_id = request.game_id or "unknown"
+        logger.debug("[Game %s] Processing move prediction request with %s provider (model: %s)",
+                    game_id, current_provider.get_provider_name(), request.model)
+        
+        board_state = request.board_state
+        current_player = board_state.get("currentPlayer", "unknown")
+        available_moves = board_state.get("availableMoves", [])
         
+        logger.debug("[Game %s] Current player: %s, Available moves: %d", game_id, current_player, len(available_moves))
+        
+        # A single legal move needs no analysis: skip the LLM round trip entirely
+        forced_prediction = _forced_move_prediction(board_state, game_id)
+        if forced_prediction is not None:
+            logger.debug("[Game %s] Only one legal move, skipping %s call", game_id, current_provider.get_provider_name())
+            background_tasks.add_task(_record_move, game_id, board_state, "", forced_prediction, request.provider, request.model)
+            return forced_prediction
+        
+        analysis_prompt = _build_analysis_prompt(board_state)
+        
+        # Reuse a previous prediction for this exact position when available
+        cache_key = _prediction_cache_key(board_state, request.provider, request.model)
+        prediction = prediction_cache.get(cache_key) if cache_key else None
+        if prediction is not None:
+            logger.debug("[Game %s] Using cached prediction for this position", game_id)
+        else:
+            prediction = await _coalesced_prediction(cache_key, current_provider, analysis_prompt, board_state, game_id)
+        
+        background_tasks.add_task(_record_move, game_id, board_state, analysis_prompt, prediction, request.provider, request.model)
+        
+        return prediction
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error predicting move: {str(e)}")
 
+def _sse_event(data: Any, event: Optional[str] = None) -> str:
+    """Format a Server-Sent Events frame"""
+    frame = f"event: {event}\n" if event else ""
+    return f"{frame}data: {orjson.dumps(data).decode()}\n\n"
+
+@app.post("/predict-move-stream")
+async def predict_next_move_stream(request: PredictMoveRequest):
+    """
+    Stream the AI provider's analysis as Server-Sent Events while it is generated.
+    
+    Each "message" frame carries the new text delta plus the cumulative text so far;
+    a final "tool_result" frame carries the full PredictMoveResponse. The move is executed
+    as soon as the provider emits a complete move call, and generation stops there.
+    """
+    current_provider = _get_request_provider(request)
+    game_id = request.game_id or "unknown"
+    board_state = request.board_state
+    analysis_prompt = _build_analysis_prompt(board_state)
+    cache_key = _prediction_cache_key(board_state, request.provider, request.model)
+    
+    logger.debug("[Game %s] Streaming move prediction with %s provider (model: %s)",
+                game_id, current_provider.get_provider_name(), request.model)
+    
+    async def event_stream():
+        prediction = _forced_move_prediction(board_state, game_id)
+        if prediction is None and cache_key:
+            prediction = prediction_cache.get(cache_key)
+        if prediction is None:
+            text_parts = []
+            try:
+                # aclosing() makes breaking out early close the upstream provider stream
+                async with aclosing(current_provider.stream_move_prediction(
+                    system_message=SYSTEM_MESSAGE,
+                    user_prompt=analysis_prompt,
+                    tools=TOOL_DEFINITIONS
+                )) as events:
+                    async for event in events:
+                        if event["type"] == "text":
+                            text_parts.append(event["text"])
+                            yield _sse_event({"delta": event["text"], "text": "".join(text_parts)})
+                        elif event["type"] == "tool_call" and event["tool_call"]["tool"] == "move":
+                            # The first complete move call is all we need: stop generating and execute it now
+                            analysis_text = "".join(text_parts)
+                            tool_calls = [event["tool_call"]]
+                            break
+                        elif event["type"] == "done":
+                            analysis_text = event["text_content"]
+                            tool_calls = event["tool_calls"]
+            except Exception as e:
+                logger.error("%s streaming call failed: %s", current_provider.get_provider_name(), e)
+                yield _sse_event({"detail": f"Failed to get response from {current_provider.get_provider_name()}: {str(e)}"}, event="error")
+                return
+            
+            prediction = _execute_tool_calls(analysis_text, tool_calls, game_id)
+            if cache_key and _is_cacheable_prediction(prediction, board_state):
+                prediction_cache.set(cache_key, prediction)
+        else:
+            yield _sse_event({"delta": prediction.analysis, "text": prediction.analysis})
+        
+        _record_move(game_id, board_state, analysis_prompt, prediction, request.provider, request.model)
+        yield _sse_event(prediction.model_dump(), event="tool_result")
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.post("/predict-moves-batch", response_model=PredictMovesBatchResponse)
+async def predict_moves_batch(request: PredictMovesBatchRequest):
+    """
+    Submit many positions for offline prediction through the provider's message batch API.
+    
+    Meant for bulk replay and evaluation rather than live play: batches cost less and draw on a
+    separate rate limit, but results can take minutes to arrive. Poll
+    GET /predict-moves-batch/{batch_id} with the same provider for the results.
+    """
+    if not request.positions:
+        raise HTTPException(status_code=400, detail="At least one position is required")
+    if request.model == AUTO_MODEL:
+        # One batch runs on one model, so there is no per-position tier to pick
+        raise HTTPException(status_code=400, detail="Model 'auto' is not supported for batches")
+    
+    current_provider = _get_request_provider(request)
+    if not current_provider.supports_batches:
+        raise HTTPException(status_code=400, detail=f"Provider '{request.provider}' does not support message batches")
+    
+    # custom_id must match ^[a-zA-Z0-9_-]{1,64}$, so index positions rather than trusting client game IDs
+    user_prompts = {
+        f"position-{index}": _build_analysis_prompt(position.board_state)
+        for index, position in enumerate(request.positions)
+    }
+    
+    try:
+        batch_id = await current_provider.submit_batch(SYSTEM_MESSAGE, user_prompts, TOOL_DEFINITIONS)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error submitting batch: {str(e)}")
+    
+    logger.info("Submitted batch %s with %d positions to %s (model: %s)",
+                batch_id, len(user_prompts), current_provider.get_provider_name(), request.model)
+    return PredictMovesBatchResponse(batch_id=batch_id, custom_ids=list(user_prompts))
+
+@app.get("/predict-moves-batch/{batch_id}", response_model=BatchResultsResponse)
+async def get_predict_moves_batch(batch_id: str, provider: str = DEFAULT_PROVIDER):
+    """
+    Return the predictions for a submitted batch, keyed by custom_id, once it has finished
+    """
+    if not AIProviderFactory.is_available(provider):
+        raise HTTPException(status_code=400, detail=f"Provider '{provider}' not available")
+    current_provider = create_ai_provider(provider_name=provider)
+    if not current_provider.supports_batches:
+        raise HTTPException(status_code=400, detail=f"Provider '{provider}' does not support message batches")
+    
+    try:
+        batch_results = await current_provider.get_batch_results(batch_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving batch: {str(e)}")
+    
+    if batch_results is None:
+        return BatchResultsResponse(batch_id=batch_id, status="in_progress")
+    
+    results = {}
+    errors = {}
+    for custom_id, ai_response in batch_results.items():
+        if "error" in ai_response:
+            errors[custom_id] = ai_response["error"]
+        else:
+            # Batch positions aren't tied to a live game, so moves are executed without one
+            results[custom_id] = _execute_tool_calls(ai_response["text_content"], ai_response["tool_calls"], "unknown")
+    
+    return BatchResultsResponse(batch_id=batch_id, status="ended", results=results, errors=errors)
+
 @app.post("/log-winner", response_model=LogWinnerResponse)
 async def log_game_winner(request: LogWinnerRequest):
     """
@@ -527,22 +1120,10 @@ async def log_game_winner(request: LogWinnerRequest):
         if winner_type == "ai" and (not request.provider or not request.model):
             raise HTTPException(status_code=400, detail="provider and model are required when winner_type is 'ai'")
         
-        # Check if game exists in moves table
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM game_moves WHERE game_id = ?", (game_id,))
-        total_records = cursor.fetchone()[0]
-        conn.close()
-        
-        if total_records == 0:
-            raise HTTPException(status_code=404, detail=f"No game records found for game_id: {game_id}")
-        
-        print(f"[Game {game_id}] Logging winner: {winner_color} ({winner_type})")
-        if winner_type == "ai":
-            print(f"[Game {game_id}] AI Winner details: {request.provider}/{request.model}")
-        
-        # Save winner information
-        success = save_game_winner(
+        # Save winner information; the insert only happens if the game exists in the moves table
+        # SQLite calls block, so they run in the threadpool rather than on the event loop
+        success = await run_in_threadpool(
+            save_game_winner,
             game_id=game_id,
             winner_color=winner_color,
             winner_type=winner_type,
@@ -554,8 +1135,14 @@ async def log_game_winner(request: LogWinnerRequest):
         )
         
         if not success:
+            if not await run_in_threadpool(game_has_moves, game_id):
+                raise HTTPException(status_code=404, detail=f"No game records found for game_id: {game_id}")
             raise HTTPException(status_code=409, detail=f"Winner for game {game_id} has already been logged")
         
+        logger.info("[Game %s] Logged winner: %s (%s)", game_id, winner_color, winner_type)
+        if winner_type == "ai":
+            logger.info("[Game %s] AI Winner details: %s/%s", game_id, request.provider, request.model)
+        
         winner_info = {
             "color": winner_color,
             "type": winner_type,
@@ -615,4 +1202,12 @@ def _get_provider_description(provider: str) -> str:
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    # Each worker is a separate process with its own provider clients, in-memory
+    # prediction/prompt caches and in-flight map; only the SQLite database is shared between them.
+    # WEB_CONCURRENCY overrides the worker count, as with uvicorn's own CLI.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.environ.get("WEB_CONCURRENCY", min(8, os.cpu_count() or 1)))
+    ) 
\ No newline at end of file
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# The app modules live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# main initializes its database on import; keep that out of the working tree
+os.environ.setdefault("CHECKERS_DB_PATH", os.path.join(tempfile.mkdtemp(), "checkers_game_data.db"))
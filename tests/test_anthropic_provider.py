@@ -0,0 +1,49 @@
+import asyncio
+from types import SimpleNamespace
+
+import ai_providers
+from ai_providers import AnthropicProvider
+
+
+def message(text, stop_reason):
+    return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)], stop_reason=stop_reason)
+
+
+class FakeMessages:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.max_tokens = []
+    
+    async def create(self, **params):
+        self.max_tokens.append(params["max_tokens"])
+        return self.responses.pop(0)
+
+
+def provider_with(responses):
+    provider = AnthropicProvider(api_key="test")
+    provider.client = SimpleNamespace(messages=FakeMessages(responses))
+    return provider
+
+
+def test_truncated_response_without_move_is_retried_with_higher_cap():
+    provider = provider_with([
+        message("<analysis>long analysis", "max_tokens"),
+        message('<move_execution>\nfrom_position="C3", to_position="D4"', "stop_sequence"),
+    ])
+    
+    result = asyncio.run(provider.generate_move_prediction("system", "prompt"))
+    
+    assert provider.client.messages.max_tokens == [
+        ai_providers.MAX_OUTPUT_TOKENS, ai_providers.TRUNCATED_RETRY_MAX_OUTPUT_TOKENS
+    ]
+    assert result["tool_calls"][0]["arguments"] == {"from_position": "C3", "to_position": "D4"}
+
+
+def test_complete_response_is_not_retried():
+    provider = provider_with([
+        message('<move_execution>\nfrom_position="C3", to_position="D4"', "stop_sequence"),
+    ])
+    
+    asyncio.run(provider.generate_move_prediction("system", "prompt"))
+    
+    assert provider.client.messages.max_tokens == [ai_providers.MAX_OUTPUT_TOKENS]
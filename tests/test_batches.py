@@ -0,0 +1,119 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from ai_providers import AIProvider, AIProviderFactory
+
+
+class FakeBatchProvider(AIProvider):
+    """Keeps submitted prompts in memory; the batch ends on the second results poll"""
+    
+    supports_batches = True
+    batches = {}
+    
+    def __init__(self, api_key=None, model=None):
+        self.model = model
+    
+    async def generate_move_prediction(self, system_message, user_prompt, tools=None):
+        raise AssertionError("batch endpoints must not make live calls")
+    
+    async def submit_batch(self, system_message, user_prompts, tools=None):
+        batch_id = f"batch-{len(self.batches)}"
+        self.batches[batch_id] = {"prompts": user_prompts, "polls": 0}
+        return batch_id
+    
+    async def get_batch_results(self, batch_id):
+        batch = self.batches[batch_id]
+        batch["polls"] += 1
+        if batch["polls"] < 2:
+            return None
+        results = {
+            custom_id: {"text_content": "analysis", "raw_response": None, "tool_calls": [
+                {"tool": "move", "arguments": {"from_position": "C3", "to_position": "D4"}, "id": "call"}
+            ]}
+            for custom_id in batch["prompts"]
+        }
+        results["position-expired"] = {"error": "expired"}
+        return results
+    
+    def get_provider_name(self):
+        return "fakebatch"
+
+
+class FakeLiveProvider(FakeBatchProvider):
+    supports_batches = False
+    
+    def get_provider_name(self):
+        return "fakelive"
+
+
+BOARD_STATE = {
+    "currentPlayer": "red",
+    "availableMoves": [
+        {"from": {"notation": "C3"}, "to": {"notation": "D4"}, "isJump": False},
+        {"from": {"notation": "C3"}, "to": {"notation": "B4"}, "isJump": False},
+    ],
+}
+
+
+@pytest.fixture
+def client():
+    AIProviderFactory.register_provider("fakebatch", FakeBatchProvider)
+    AIProviderFactory.register_provider("fakelive", FakeLiveProvider)
+    FakeBatchProvider.batches = {}
+    with TestClient(main.app) as client:
+        yield client
+    for name in ("fakebatch", "fakelive"):
+        AIProviderFactory._providers.pop(name)
+        for cache_key in [key for key in AIProviderFactory._instance_cache if key[0] == name]:
+            del AIProviderFactory._instance_cache[cache_key]
+
+
+def submit(client, provider="fakebatch", positions=2, model="model"):
+    return client.post("/predict-moves-batch", json={
+        "positions": [{"board_state": BOARD_STATE}] * positions, "provider": provider, "model": model
+    })
+
+
+def test_submit_returns_one_custom_id_per_position(client):
+    response = submit(client)
+    
+    assert response.status_code == 200
+    assert response.json() == {"batch_id": "batch-0", "custom_ids": ["position-0", "position-1"]}
+    assert "C3-D4" in FakeBatchProvider.batches["batch-0"]["prompts"]["position-0"]
+
+
+def test_results_are_in_progress_until_the_batch_ends(client):
+    submit(client)
+    
+    in_progress = client.get("/predict-moves-batch/batch-0", params={"provider": "fakebatch"})
+    ended = client.get("/predict-moves-batch/batch-0", params={"provider": "fakebatch"})
+    
+    assert in_progress.json() == {"batch_id": "batch-0", "status": "in_progress", "results": {}, "errors": {}}
+    body = ended.json()
+    assert body["status"] == "ended"
+    assert {custom_id: result["suggested_move"] for custom_id, result in body["results"].items()} == {
+        "position-0": {"from": "C3", "to": "D4"},
+        "position-1": {"from": "C3", "to": "D4"},
+    }
+    assert body["errors"] == {"position-expired": "expired"}
+
+
+def test_provider_without_batch_support_is_a_400(client):
+    submitted = submit(client, provider="fakelive")
+    polled = client.get("/predict-moves-batch/batch-0", params={"provider": "fakelive"})
+    
+    for response in (submitted, polled):
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Provider 'fakelive' does not support message batches"
+
+
+@pytest.mark.parametrize("positions, model, detail", [
+    (0, "model", "At least one position is required"),
+    (1, "auto", "Model 'auto' is not supported for batches"),
+])
+def test_invalid_batch_requests_are_a_400(client, positions, model, detail):
+    response = submit(client, positions=positions, model=model)
+    
+    assert response.status_code == 400
+    assert response.json()["detail"] == detail
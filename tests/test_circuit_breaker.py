@@ -0,0 +1,51 @@
+import pytest
+
+from ai_providers import CircuitBreaker, CircuitOpenError
+
+
+def open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_half_open_lets_a_single_trial_call_through():
+    breaker = open_breaker()
+    
+    breaker.check("fake")
+    
+    # Everyone else keeps failing fast while the trial call is in flight
+    with pytest.raises(CircuitOpenError):
+        breaker.check("fake")
+
+
+def test_trial_success_closes_the_circuit():
+    breaker = open_breaker()
+    breaker.check("fake")
+    
+    breaker.record_success()
+    
+    breaker.check("fake")
+    breaker.check("fake")
+
+
+def test_trial_failure_reopens_the_circuit():
+    breaker = open_breaker()
+    breaker.reset_timeout = 60.0
+    breaker._opened_at -= 60.0
+    breaker.check("fake")
+    
+    breaker.record_failure()
+    
+    with pytest.raises(CircuitOpenError):
+        breaker.check("fake")
+
+
+def test_released_trial_lets_the_next_caller_try():
+    breaker = open_breaker()
+    breaker.check("fake")
+    
+    breaker.release()
+    
+    breaker.check("fake")
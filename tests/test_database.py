@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+def move_row(game_id: str, move_number: int = 1) -> tuple:
+    return (game_id, "red", move_number, "2024-01-01T12:00:00", "prompt", "analysis",
+            "move", "{}", None, main.compress_json(b"{}"), "anthropic", "model")
+
+
+def count_moves(game_id: str) -> int:
+    with main._db_lock:
+        return main.get_db_connection().execute(
+            "SELECT COUNT(*) FROM game_moves WHERE game_id = ?", (game_id,)
+        ).fetchone()[0]
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    main.close_database()
+    monkeypatch.setattr(main, "DATABASE_PATH", str(tmp_path / "checkers_game_data.db"))
+    main.init_database()
+    yield
+    main.close_database()
+
+
+def test_stop_flushes_queued_rows(database):
+    async def scenario():
+        writer = main.MoveWriter()
+        writer.start()
+        for move_number in range(3):
+            writer.submit(move_row("g1", move_number))
+        await writer.stop()
+    
+    asyncio.run(scenario())
+    
+    assert count_moves("g1") == 3
+
+
+def test_rows_submitted_from_a_thread_are_written(database):
+    async def scenario():
+        writer = main.MoveWriter()
+        writer.start()
+        await asyncio.gather(*[
+            asyncio.to_thread(writer.submit, move_row("g1", move_number))
+            for move_number in range(10)
+        ])
+        await writer.stop()
+    
+    asyncio.run(scenario())
+    
+    assert count_moves("g1") == 10
+
+
+def test_submit_without_start_writes_synchronously(database):
+    main.MoveWriter().submit(move_row("g1"))
+    
+    assert count_moves("g1") == 1
+
+
+def test_log_winner_after_flush(database):
+    with TestClient(main.app):
+        # Queued on the app's writer and flushed when the lifespan stops it
+        main.save_move_to_db("g1", "red", 1, "prompt", "analysis", board_state=main.compress_json(b"{}"))
+    
+    winner = {"game_id": "g1", "winner_color": "red", "winner_type": "human"}
+    with TestClient(main.app) as client:
+        assert client.post("/log-winner", json=winner).status_code == 200
+        assert client.post("/log-winner", json=winner).status_code == 409
+        assert client.post("/log-winner", json={**winner, "game_id": "unknown"}).status_code == 404
+
+
+def test_schema_script_is_skipped_when_user_version_matches(database):
+    with main._db_lock:
+        main.get_db_connection().execute("DROP TABLE game_winners")
+    
+    main.init_database()
+    
+    with main._db_lock:
+        tables = {row[0] for row in main.get_db_connection().execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "game_winners" not in tables
+
+
+def test_schema_script_runs_on_an_older_database(database):
+    with main._db_lock:
+        conn = main.get_db_connection()
+        conn.execute("DROP TABLE game_winners")
+        conn.execute("PRAGMA user_version = 0")
+    
+    main.init_database()
+    
+    with main._db_lock:
+        conn = main.get_db_connection()
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        user_version = conn.execute("PRAGMA user_version").fetchone()[0]
+    assert "game_winners" in tables
+    assert user_version == main.SCHEMA_VERSION
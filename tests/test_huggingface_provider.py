@@ -0,0 +1,48 @@
+import asyncio
+from types import SimpleNamespace
+
+from ai_providers import HuggingFaceProvider
+
+TOOLS = [{"name": "move", "description": "Move a piece", "input_schema": {"type": "object", "properties": {}}}]
+
+
+def provider_streaming(deltas):
+    async def create(**params):
+        async def chunks():
+            for delta in deltas:
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+        return chunks()
+    
+    provider = HuggingFaceProvider(api_key="test")
+    provider.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return provider
+
+
+def collect(provider, tools=TOOLS):
+    async def scenario():
+        return [event async for event in provider.stream_move_prediction("system", "prompt", tools)]
+    return asyncio.run(scenario())
+
+
+def test_tool_call_split_across_chunks_is_emitted_when_its_line_ends():
+    events = collect(provider_streaming(["Center control.\nTOOL_", "CALL:move:C3", ":D4", "\nDone."]))
+    
+    types = [event["type"] for event in events]
+    # The call goes out right after the chunk that ends its line
+    assert types == ["text", "text", "text", "text", "tool_call", "done"]
+    assert events[4]["tool_call"]["arguments"] == {"from_position": "C3", "to_position": "D4"}
+    assert events[-1]["text_content"] == "Center control.\nTOOL_CALL:move:C3:D4\nDone."
+    assert len(events[-1]["tool_calls"]) == 1
+
+
+def test_marker_inside_a_sentence_is_not_a_tool_call():
+    events = collect(provider_streaming(["I will not write TOOL_CALL:move:C3:D4 here\n"]))
+    
+    assert [event["type"] for event in events] == ["text", "done"]
+
+
+def test_no_tools_means_no_tool_calls():
+    events = collect(provider_streaming(["TOOL_CALL:move:C3:D4\n"]), tools=None)
+    
+    assert [event["type"] for event in events] == ["text", "done"]
+    assert events[-1]["tool_calls"] == []
@@ -0,0 +1,268 @@
+import asyncio
+
+import orjson
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+from ai_providers import AIProvider, AIProviderFactory
+
+
+class FakeProvider(AIProvider):
+    """Suggests from_position->to_position after a short delay, or fails when fail=True"""
+    
+    def __init__(self, api_key=None, model=None, from_position="C3", to_position="D4", fail=False):
+        self.model = model
+        self.move = {"from_position": from_position, "to_position": to_position}
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+    
+    async def generate_move_prediction(self, system_message, user_prompt, tools=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError("provider failed")
+        return {"text_content": "analysis", "tool_calls": [{"tool": "move", "arguments": self.move, "id": "call"}],
+                "raw_response": None}
+    
+    def get_provider_name(self):
+        return "fake"
+
+
+BOARD_STATE = {
+    "currentPlayer": "red",
+    "availableMoves": [
+        {"from": {"notation": "C3"}, "to": {"notation": "D4"}, "isJump": False},
+        {"from": {"notation": "C3"}, "to": {"notation": "B4"}, "isJump": False},
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def clean_prediction_state():
+    main.prediction_cache._entries.clear()
+    main.inflight_predictions.clear()
+    yield
+    main.prediction_cache._entries.clear()
+    main.inflight_predictions.clear()
+
+
+def predict(provider, cache_key="position"):
+    return main._coalesced_prediction(cache_key, provider, "prompt", BOARD_STATE, "game")
+
+
+def test_concurrent_requests_share_one_provider_call():
+    provider = FakeProvider()
+    
+    async def scenario():
+        return await asyncio.gather(*[predict(provider) for _ in range(5)])
+    
+    predictions = asyncio.run(scenario())
+    
+    assert provider.calls == 1
+    assert all(prediction.suggested_move == {"from": "C3", "to": "D4"} for prediction in predictions)
+    assert main.inflight_predictions == {}
+
+
+def test_failure_reaches_every_waiter():
+    provider = FakeProvider(fail=True)
+    
+    async def scenario():
+        return await asyncio.gather(*[predict(provider) for _ in range(3)], return_exceptions=True)
+    
+    results = asyncio.run(scenario())
+    
+    assert provider.calls == 1
+    assert all(isinstance(result, HTTPException) and result.status_code == 500 for result in results)
+    assert main.inflight_predictions == {}
+
+
+def test_cancelled_leader_hands_over_to_waiters():
+    provider = FakeProvider()
+    
+    async def scenario():
+        leader = asyncio.create_task(predict(provider))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(predict(provider)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.gather(*waiters)
+    
+    predictions = asyncio.run(scenario())
+    
+    # The cancelled leader's call is cancelled with it; the waiter that took over makes the only completed call
+    assert provider.calls == 2
+    assert provider.cancelled == 1
+    assert all(prediction.suggested_move == {"from": "C3", "to": "D4"} for prediction in predictions)
+
+
+def test_cancelled_request_cancels_its_provider_call():
+    provider = FakeProvider()
+    
+    async def scenario():
+        request = asyncio.create_task(predict(provider))
+        await asyncio.sleep(0.01)
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+    
+    asyncio.run(scenario())
+    
+    # The provider call doesn't outlive the request (and keep a concurrency slot)
+    assert provider.cancelled == 1
+    assert main.inflight_predictions == {}
+
+
+def test_illegal_suggestion_is_not_cached():
+    provider = FakeProvider(from_position="Z9", to_position="Z8")
+    
+    async def scenario():
+        await predict(provider)
+        await predict(provider)
+    
+    asyncio.run(scenario())
+    
+    assert provider.calls == 2
+    assert main.prediction_cache.get("position") is None
+
+
+def test_legal_suggestion_is_cached():
+    asyncio.run(predict(FakeProvider()))
+    
+    assert main.prediction_cache.get("position").suggested_move == {"from": "C3", "to": "D4"}
+
+
+def test_prompt_renders_unhashable_client_values():
+    board_state = {
+        "currentPlayer": "red",
+        "moveHistory": [{"player": "red", "fullMoveNumber": 1, "from": "A1", "to": "C3",
+                         "isJump": True, "capturedPiece": {"notation": "B2"}}],
+        "totalMoves": 1,
+    }
+    
+    assert "1. A1x{'notation': 'B2'}" in main._build_analysis_prompt(board_state)
+
+
+@pytest.mark.parametrize("endpoint", ["/predict-move", "/predict-move-stream"])
+@pytest.mark.parametrize("body, detail", [
+    ({"provider": "unknown", "model": "any"}, "Provider 'unknown' not available"),
+    ({"provider": "huggingface", "model": "auto"}, "Model 'auto' is not supported"),
+])
+def test_invalid_provider_or_model_is_a_400(endpoint, body, detail):
+    with TestClient(main.app) as client:
+        response = client.post(endpoint, json={"board_state": BOARD_STATE, **body})
+    
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith(detail)
+
+
+class FakeStreamingProvider(FakeProvider):
+    """Streams two text deltas and a move call, then text the endpoint should never read"""
+    
+    streams = 0
+    closed_early = 0
+    
+    async def stream_move_prediction(self, system_message, user_prompt, tools=None):
+        FakeStreamingProvider.streams += 1
+        try:
+            yield {"type": "text", "text": "Take "}
+            yield {"type": "text", "text": "the center."}
+            yield {"type": "tool_call", "tool_call": {"tool": "move", "arguments": self.move, "id": "call"}}
+            yield {"type": "text", "text": "never sent"}
+        except GeneratorExit:
+            FakeStreamingProvider.closed_early += 1
+            raise
+
+
+@pytest.fixture
+def streaming_client():
+    AIProviderFactory.register_provider("fakestream", FakeStreamingProvider)
+    FakeStreamingProvider.streams = 0
+    FakeStreamingProvider.closed_early = 0
+    with TestClient(main.app) as client:
+        yield client
+    AIProviderFactory._providers.pop("fakestream")
+    for cache_key in [key for key in AIProviderFactory._instance_cache if key[0] == "fakestream"]:
+        del AIProviderFactory._instance_cache[cache_key]
+
+
+def sse_frames(body: str):
+    """(event, data) per Server-Sent Events frame; unnamed frames are "message" events"""
+    frames = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        frames.append((fields.get("event", "message"), orjson.loads(fields["data"])))
+    return frames
+
+
+def test_stream_sends_text_then_executes_the_first_move_call(streaming_client):
+    response = streaming_client.post("/predict-move-stream", json={
+        "board_state": BOARD_STATE, "provider": "fakestream", "model": "model"
+    })
+    
+    frames = sse_frames(response.text)
+    assert frames[:2] == [
+        ("message", {"delta": "Take ", "text": "Take "}),
+        ("message", {"delta": "the center.", "text": "Take the center."}),
+    ]
+    event, prediction = frames[2]
+    assert event == "tool_result"
+    assert prediction["suggested_move"] == {"from": "C3", "to": "D4"}
+    assert prediction["analysis"] == "Take the center."
+    assert len(frames) == 3
+    # Generation stops at the move call
+    assert FakeStreamingProvider.closed_early == 1
+
+
+def test_stream_replays_a_cached_prediction(streaming_client):
+    body = {"board_state": {**BOARD_STATE, "boardNotation": ["C3:r"]}, "provider": "fakestream", "model": "model"}
+    
+    streaming_client.post("/predict-move-stream", json=body)
+    frames = sse_frames(streaming_client.post("/predict-move-stream", json=body).text)
+    
+    assert FakeStreamingProvider.streams == 1
+    assert frames[0] == ("message", {"delta": "Take the center.", "text": "Take the center."})
+    assert frames[1][0] == "tool_result"
+
+
+def test_forced_move_skips_the_provider():
+    board_state = {"availableMoves": [{"from": {"notation": "C3"}, "to": {"notation": "D4"}, "isJump": False}]}
+    
+    prediction = main._forced_move_prediction(board_state, "game")
+    
+    assert prediction.suggested_move == {"from": "C3", "to": "D4"}
+    assert prediction.tool_calls[0]["id"] == "forced"
+
+
+def test_single_jump_is_forced_even_with_plain_moves_listed():
+    board_state = {"availableMoves": [
+        {"from": {"notation": "C3"}, "to": {"notation": "E5"}, "isJump": True},
+        {"from": {"notation": "A3"}, "to": {"notation": "B4"}, "isJump": False},
+    ]}
+    
+    assert main._forced_move_prediction(board_state, "game").suggested_move == {"from": "C3", "to": "E5"}
+
+
+def test_position_with_a_choice_is_not_forced():
+    assert main._forced_move_prediction(BOARD_STATE, "game") is None
+
+
+def test_compact_board_groups_squares_by_piece():
+    board_state = {"boardNotation": ["E1:r", "A1:r", "G3:R", "D8:w", "B8:w", "bogus"]}
+    
+    assert main._compact_board(board_state) == "r:A1,E1 R:G3 w:B8,D8"
+
+
+@pytest.mark.parametrize("board_state, expected", [
+    ({"boardString": " r r\nw w"}, " r r\nw w"),
+    ({}, "Board not available"),
+    ({"boardNotation": ["A1:x"]}, "empty"),
+])
+def test_compact_board_fallbacks(board_state, expected):
+    assert main._compact_board(board_state) == expected
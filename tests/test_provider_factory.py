@@ -0,0 +1,48 @@
+import pytest
+
+from ai_providers import AIProvider, AIProviderFactory
+
+
+class FakeProvider(AIProvider):
+    closed = []
+    
+    def __init__(self, api_key=None, model=None):
+        self.model = model
+    
+    async def generate_move_prediction(self, system_message, user_prompt, tools=None):
+        return {"text_content": "", "tool_calls": [], "raw_response": None}
+    
+    def get_provider_name(self):
+        return "fake"
+    
+    async def aclose(self):
+        FakeProvider.closed.append(self.model)
+
+
+@pytest.fixture
+def factory(monkeypatch):
+    monkeypatch.setattr(AIProviderFactory, "INSTANCE_CACHE_MAXSIZE", 3)
+    AIProviderFactory.register_provider("fake", FakeProvider)
+    FakeProvider.closed = []
+    yield AIProviderFactory
+    AIProviderFactory._providers.pop("fake")
+    for cache_key in [key for key in AIProviderFactory._instance_cache if key[0] == "fake"]:
+        del AIProviderFactory._instance_cache[cache_key]
+
+
+def test_instances_are_reused(factory):
+    assert factory.create_provider("fake", model="a") is factory.create_provider("fake", model="a")
+
+
+def test_cache_evicts_least_recently_used_instance_without_closing_it(factory):
+    for model in ["a", "b", "c"]:
+        factory.create_provider("fake", model=model)
+    # Touch "a" so "b" becomes the least recently used
+    factory.create_provider("fake", model="a")
+    for model in ["junk-1", "junk-2"]:
+        factory.create_provider("fake", model=model)
+    
+    cached_models = [key[2] for key in factory._instance_cache if key[0] == "fake"]
+    assert cached_models == ["a", "junk-1", "junk-2"]
+    # A request may still hold an evicted instance, so it must stay usable
+    assert FakeProvider.closed == []